@@ -1,17 +1,44 @@
+import time
+_START_TIME = time.perf_counter() # Profiling: measured from the very start of the module
+
 import os
 import sys
 import json
+import re
+import marshal
+import sqlite3
+import hashlib
+import unicodedata
 import urllib.parse
+import itertools
+import datetime
+import contextlib
 import traceback # Import traceback for better error logging
 
 import xbmc
+import xbmcaddon
 import xbmcgui
 import xbmcplugin
 import xbmcvfs
 
+# --- Profiling ---
+# Phase timings (seconds) of this invocation. Always collected (a few coarse timers per
+# click), only written to the profile when the 'profiling' setting is enabled.
+PHASE_TIMINGS = {'import_modules': time.perf_counter() - _START_TIME}
+
+@contextlib.contextmanager
+def timed(phase):
+    """Adds the time spent in the block to PHASE_TIMINGS[phase]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_TIMINGS[phase] = PHASE_TIMINGS.get(phase, 0.0) + time.perf_counter() - start
+
 # --- Constants ---
-ADDON_HANDLE = int(sys.argv[1])
-BASE_URL = sys.argv[0] # The plugin:// URL base
+# Plugin invocations get (base URL, handle, query) in sys.argv; service.py imports this module without them
+ADDON_HANDLE = int(sys.argv[1]) if len(sys.argv) > 1 else -1
+BASE_URL = sys.argv[0] if sys.argv[0].startswith('plugin://') else 'plugin://plugin.video.guemara/' # The plugin:// URL base
 try:
     ADDON_ID = xbmc.getAddonInfo('id')
     ADDON_PROFILE = xbmcvfs.translatePath(f'special://profile/addon_data/{ADDON_ID}/')
@@ -19,9 +46,27 @@ try:
 except Exception as e:
     xbmc.log(f"[Guemara] Error getting Addon ID/Paths: {e}. Using fallback.", xbmc.LOGWARNING)
     ADDON_ID = 'plugin.video.guemara' # Fallback ID
+    ADDON_PROFILE = xbmcvfs.translatePath(f'special://profile/addon_data/{ADDON_ID}/')
     ADDON_PATH = xbmcvfs.translatePath(f'special://home/addons/{ADDON_ID}')
 
 STRUCTURE_FILE = os.path.join(ADDON_PATH, 'resources', 'guemara_structure.json')
+BUNDLED_CATALOG_DIR = os.path.join(ADDON_PATH, 'resources', 'catalog')
+UPDATES_DIR = os.path.join(ADDON_PROFILE, 'catalog') # Catalogs downloaded by resources/lib/catalog_updates.py
+UPDATES_STATE_FILE = os.path.join(UPDATES_DIR, 'state.json')
+# The paths of the active catalog, bundled or downloaded, are set by select_catalog_dir()
+CATALOG_DIR = BUNDLED_CATALOG_DIR
+MANIFEST_FILE = os.path.join(CATALOG_DIR, 'manifest.json')
+SEARCH_INDEX_FILE = os.path.join(CATALOG_DIR, 'search_index.json')
+CATALOG_DB_FILE = os.path.join(CATALOG_DIR, 'guemara.db') # Optional, see dev/build_structure.py --sqlite
+CATALOG_VERSION_FILE = os.path.join(CATALOG_DIR, 'version') # Content hash written by dev/build_structure.py
+DAF_YOMI_FILE = os.path.join(CATALOG_DIR, 'daf_yomi.json') # Daf Yomi cycle table
+CACHE_DIR = os.path.join(ADDON_PROFILE, 'cache')
+CACHE_FORMAT = 1 # Bump when the layout of the cached tuples changes
+PROFILING_DIR = os.path.join(ADDON_PROFILE, 'profiling')
+WIDGET_CACHE_FILE = os.path.join(ADDON_PROFILE, 'widget_cache.json') # Results of the Daf Yomi widgets
+WIDGET_CACHE_TTL = 600 # Seconds, the results are also dropped at midnight
+PROGRESS_DB_FILE = os.path.join(ADDON_PROFILE, 'progress.db')
+WATCHED_THRESHOLD = 0.9 # Fraction of a lesson after which it counts as watched
 
 xbmc.log("=== [Guemara] default.py execution started ===", xbmc.LOGINFO)
 xbmc.log(f"[Guemara] Addon Handle: {ADDON_HANDLE}", xbmc.LOGINFO)
@@ -30,57 +75,780 @@ xbmc.log(f"[Guemara] Addon Path: {ADDON_PATH}", xbmc.LOGINFO)
 xbmc.log(f"[Guemara] Structure File Path: {STRUCTURE_FILE}", xbmc.LOGINFO)
 
 
-# --- Load Structure File ---
-try:
-    xbmc.log(f"[Guemara] Attempting to load structure file: {STRUCTURE_FILE}", xbmc.LOGINFO)
+# --- Catalog Loading ---
+# The catalog is loaded on demand by the route that needs it, never at import time:
+# 'play' needs nothing from it, the root and Seder views only need the small manifest
+# (sedarim, books and lesson counts), the lesson list opens the shard of a single
+# masejta, and search uses a prebuilt index plus the shards of the matching books.
+# Only the fallbacks need the full structure with every lesson URL.
+# Without the sharded layout (resources/catalog/) everything falls back to
+# guemara_structure.json. Parsed files are cached with marshal in the addon profile,
+# so a directory click normally costs a marshal load instead of a JSON parse.
+# When service.py runs, the catalog files are read from memory instead (see below).
+_STRUCTURE = None
+_INDEX = None
+_SEARCH_INDEX = None
+_CATALOG_DB = None
+_CATALOG_VERSION = None
+_SERVICE_WINDOW = None
+
+def read_update_state():
+    """Returns the state of the remote catalog updates (see resources/lib/catalog_updates.py), {} if there is none."""
+    try:
+        with open(UPDATES_STATE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def read_version_file(catalog_dir):
+    try:
+        with open(os.path.join(catalog_dir, 'version'), encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+def select_catalog_dir():
+    """Points the catalog paths at the active catalog: the last downloaded update, else the bundled one.
+
+    A downloaded catalog only applies on top of the bundled catalog it was checked against,
+    so installing a new addon version always brings its own catalog back first.
+    """
+    global CATALOG_DIR, MANIFEST_FILE, SEARCH_INDEX_FILE, CATALOG_DB_FILE, CATALOG_VERSION_FILE, DAF_YOMI_FILE
+    global _INDEX, _SEARCH_INDEX, _CATALOG_DB, _CATALOG_VERSION, _SERVICE_WINDOW
+    catalog_dir = BUNDLED_CATALOG_DIR
+    if os.path.exists(UPDATES_STATE_FILE):
+        state = read_update_state()
+        update_dir = os.path.join(UPDATES_DIR, state.get('current') or '-')
+        if (state.get('based_on') == read_version_file(BUNDLED_CATALOG_DIR)
+                and os.path.isfile(os.path.join(update_dir, 'manifest.json'))):
+            catalog_dir = update_dir
+    if catalog_dir == CATALOG_DIR and _CATALOG_VERSION is not None:
+        return # Unchanged, keep what is loaded
+
+    CATALOG_DIR = catalog_dir
+    MANIFEST_FILE = os.path.join(CATALOG_DIR, 'manifest.json')
+    SEARCH_INDEX_FILE = os.path.join(CATALOG_DIR, 'search_index.json')
+    CATALOG_DB_FILE = os.path.join(CATALOG_DIR, 'guemara.db')
+    CATALOG_VERSION_FILE = os.path.join(CATALOG_DIR, 'version')
+    DAF_YOMI_FILE = os.path.join(CATALOG_DIR, 'daf_yomi.json')
+    if _CATALOG_DB:
+        _CATALOG_DB.close()
+    _INDEX = _SEARCH_INDEX = _CATALOG_DB = _CATALOG_VERSION = _SERVICE_WINDOW = None
+    if CATALOG_DIR != BUNDLED_CATALOG_DIR:
+        xbmc.log(f"[Guemara] Using downloaded catalog '{CATALOG_DIR}'", xbmc.LOGINFO)
+
+select_catalog_dir()
+
+# service.py publishes the files of resources/catalog/ (manifest, shards, search index) once
+# per Kodi session as home window properties, named after their path in the catalog folder
+# and stamped with the catalog version. read_catalog_file() takes a published file from
+# there, so a click reads no catalog file at all; without the service, or while it is
+# publishing another catalog version, the files are read from disk as usual.
+SERVICE_WINDOW_ID = 10000 # Home window, alive for the whole Kodi session
+SERVICE_PROPERTY = 'plugin.video.guemara.catalog'
+
+def service_property(part):
+    """Returns the window property name of a published catalog file ('version' for the stamp)."""
+    return f"{SERVICE_PROPERTY}.{part}"
 
-    # *** REVISED: Remove explicit exists() checks ***
-    # Rely directly on xbmcvfs.File() to handle file access.
-    # This should work if the previous script could access the file.
-    f = xbmcvfs.File(STRUCTURE_FILE, 'r')
-    content = f.read()
-    f.close()
+def read_service_part(path):
+    """Returns the parsed content of a catalog file published by service.py, or None."""
+    global _SERVICE_WINDOW
+    part = os.path.relpath(path, CATALOG_DIR).replace(os.sep, '/')
+    if part.startswith('..'):
+        return None # Not in the catalog folder (e.g. the structure file)
+    if _SERVICE_WINDOW is None:
+        window = xbmcgui.Window(SERVICE_WINDOW_ID)
+        published = window.getProperty(service_property('version'))
+        _SERVICE_WINDOW = window if published and published == catalog_version() else False
+    if not _SERVICE_WINDOW:
+        return None
+    with timed('service_read'):
+        raw = _SERVICE_WINDOW.getProperty(service_property(part))
+    return json.loads(raw) if raw else None
+
+def read_json_file(path):
+    """Reads and parses a JSON file through xbmcvfs."""
+    # Rely directly on xbmcvfs.File() to handle file access (no explicit exists() checks).
+    with timed('file_read'):
+        f = xbmcvfs.File(path, 'r')
+        content = f.read()
+        f.close()
 
     if not content:
-         # Raise an error if the file was empty
-         raise ValueError("Structure file is empty")
+        # Raise an error if the file was missing or empty
+        raise ValueError(f"File is empty or missing: {path}")
 
-    GUEMARA_STRUCTURE = json.loads(content)
-    xbmc.log("[Guemara] Loaded and parsed guemara_structure.json successfully", xbmc.LOGINFO)
+    with timed('json_parse'):
+        return json.loads(content)
 
-except Exception as e:
-    # Log the specific error type and message
-    error_details = traceback.format_exc()
-    xbmc.log(f"[Guemara] Failed to load or parse structure file '{STRUCTURE_FILE}': {e}\n{error_details}", xbmc.LOGERROR)
-    # Show a more generic error to the user, log details for debugging
-    xbmcgui.Dialog().notification("Guemara", "Error loading content file", xbmcgui.NOTIFICATION_ERROR, 5000)
-    xbmcplugin.endOfDirectory(ADDON_HANDLE, succeeded=False)
-    sys.exit()
+def _cache_path(path):
+    """Maps a catalog file under the addon path to its marshal cache file in the profile."""
+    relative = os.path.relpath(path, ADDON_PATH)
+    return os.path.join(CACHE_DIR, relative.replace(os.sep, '_') + '.marshal')
+
+def _read_cache(cache_path):
+    """Returns the cached (format, size, mtime, sha1, data) tuple, or None if unusable."""
+    try:
+        with open(cache_path, 'rb') as f:
+            # marshal.loads() on the whole buffer: marshal.load(f) reads in tiny chunks, far slower
+            cached = marshal.loads(f.read())
+        if isinstance(cached, tuple) and len(cached) == 5 and cached[0] == CACHE_FORMAT:
+            return cached
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    return None
+
+def _write_cache(cache_path, cached):
+    """Writes a cache entry atomically (temp file + rename); failures are only logged."""
+    try:
+        xbmcvfs.mkdirs(CACHE_DIR)
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(marshal.dumps(cached))
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Could not write catalog cache '{cache_path}': {e}", xbmc.LOGWARNING)
+
+def read_catalog_file(path):
+    """Reads a catalog JSON file: from service.py's copy in memory, else from the marshal cache when valid.
+
+    Cache entries are validated against the source file's size and mtime. When those differ
+    (e.g. after an install or upgrade) the source's SHA-1 decides: identical content only
+    refreshes the stamp, new content is parsed again and replaces the cached data.
+    """
+    data = read_service_part(path)
+    if data is not None:
+        return data
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        # Not a plain local file, let xbmcvfs deal with it without caching
+        return read_json_file(path)
+
+    cache_path = _cache_path(path)
+    with timed('cache_load'):
+        cached = _read_cache(cache_path)
+    if cached and cached[1] == st.st_size and cached[2] == st.st_mtime_ns:
+        return cached[4]
+
+    with timed('file_read'):
+        f = xbmcvfs.File(path)
+        raw = f.readBytes()
+        f.close()
+    if not raw:
+        raise ValueError(f"File is empty or missing: {path}")
+
+    digest = hashlib.sha1(raw).hexdigest()
+    if cached and cached[3] == digest:
+        data = cached[4]
+        xbmc.log(f"[Guemara] Catalog cache still valid for '{path}', refreshing its stamp", xbmc.LOGDEBUG)
+    else:
+        with timed('json_parse'):
+            data = json.loads(raw)
+        xbmc.log(f"[Guemara] Rebuilt catalog cache for '{path}'", xbmc.LOGINFO)
+    with timed('cache_write'):
+        _write_cache(cache_path, (CACHE_FORMAT, st.st_size, st.st_mtime_ns, digest, data))
+    return data
+
+def load_structure():
+    """Returns the full catalog (with lesson URLs), loading it on first use."""
+    global _STRUCTURE
+    if _STRUCTURE is not None:
+        return _STRUCTURE
+
+    try:
+        xbmc.log(f"[Guemara] Attempting to load structure file: {STRUCTURE_FILE}", xbmc.LOGINFO)
+        _STRUCTURE = read_catalog_file(STRUCTURE_FILE)
+        xbmc.log("[Guemara] Loaded and parsed guemara_structure.json successfully", xbmc.LOGINFO)
+    except Exception as e:
+        # Log the specific error type and message
+        error_details = traceback.format_exc()
+        xbmc.log(f"[Guemara] Failed to load or parse structure file '{STRUCTURE_FILE}': {e}\n{error_details}", xbmc.LOGERROR)
+        # Show a more generic error to the user, log details for debugging
+        xbmcgui.Dialog().notification("Guemara", "Error loading content file", xbmcgui.NOTIFICATION_ERROR, 5000)
+        xbmcplugin.endOfDirectory(ADDON_HANDLE, succeeded=False)
+        sys.exit()
+    return _STRUCTURE
+
+def build_index(structure):
+    """Derives the top-level index (no lesson URLs, only counts) from the full structure.
+
+    It has the same shape as the manifest, minus the 'shard' entries."""
+    index = {}
+    for seder_key, seder_data in structure.items():
+        index[seder_key] = {
+            "description": seder_data.get("description", ""),
+            "thumb": seder_data.get("thumb"),
+            "thumb_url": seder_data.get("thumb_url"),
+            "books": {
+                book_name: {
+                    "description": book_data.get("description", ""),
+                    "lessons": len(book_data.get("lessons", {})),
+                    "thumb": book_data.get("thumb")
+                }
+                for book_name, book_data in seder_data.get("books", {}).items()
+            }
+        }
+    return index
+
+def load_index():
+    """Returns the top-level index, falling back to the full structure if the manifest is unavailable."""
+    global _INDEX
+    if _INDEX is not None:
+        return _INDEX
+
+    try:
+        _INDEX = read_catalog_file(MANIFEST_FILE)
+        xbmc.log("[Guemara] Loaded catalog manifest successfully", xbmc.LOGINFO)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Catalog manifest unavailable ({e}). Deriving the index from the structure file.", xbmc.LOGWARNING)
+        _INDEX = build_index(load_structure())
+    return _INDEX
+
+class BookLessons:
+    """The lessons of one book in the compact catalog layout, decoded on demand.
+
+    Behaves like the read-only {title: url} mapping of older catalogs. Titles are not stored:
+    they are '<book> <daf>' with consecutive dafim from `first_daf`. Each URL is rebuilt from
+    its record, [video id, signature, profile] plus an optional index into `url_templates`,
+    or is the literal URL for lessons that fit no template.
+    """
+    __slots__ = ('book', 'first_daf', 'url_templates', 'records')
+
+    def __init__(self, book, first_daf, url_templates, records):
+        self.book = book
+        self.first_daf = first_daf
+        self.url_templates = url_templates
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return (f"{self.book} {daf}" for daf in range(self.first_daf, self.first_daf + len(self.records)))
+
+    def url(self, index):
+        record = self.records[index]
+        if isinstance(record, str):
+            return record
+        return self.url_templates[record[3] if len(record) > 3 else 0].format(*record)
+
+    def index(self, title):
+        """Returns the position of a lesson title, or -1 if it is not one of this book's."""
+        book, _, daf = title.rpartition(' ')
+        if book != self.book or not daf.isdigit():
+            return -1
+        index = int(daf) - self.first_daf
+        return index if 0 <= index < len(self.records) else -1
+
+    def get(self, title, default=None):
+        index = self.index(title)
+        return self.url(index) if index >= 0 else default
+
+    def items(self, start=0, stop=None):
+        """Yields (title, url) in daf order, optionally only for positions start..stop."""
+        stop = len(self.records) if stop is None else min(stop, len(self.records))
+        return ((f"{self.book} {self.first_daf + i}", self.url(i)) for i in range(start, stop))
+
+def book_lessons(book, data):
+    """Returns the lessons of a shard or structure book entry ({title: url} in older catalogs)."""
+    lessons = data.get("lessons", {})
+    if isinstance(lessons, dict):
+        return lessons
+    return BookLessons(book, data.get("first_daf", 2), data.get("url_templates", []), lessons)
+
+def load_lessons(seder, book):
+    """Returns the lessons of one book (see BookLessons), reading only its shard when available."""
+    book_entry = load_index().get(seder, {}).get("books", {}).get(book, {})
+    shard = book_entry.get("shard")
+    if shard:
+        shard_path = os.path.join(CATALOG_DIR, *shard.split('/'))
+        try:
+            return book_lessons(book, read_catalog_file(shard_path))
+        except Exception as e:
+            xbmc.log(f"[Guemara] Failed to read shard '{shard_path}': {e}. Falling back to the structure file.", xbmc.LOGWARNING)
+
+    return book_lessons(book, load_structure().get(seder, {}).get("books", {}).get(book, {}))
+
+
+# --- Search Index ---
+# {"books": [{"seder", "book", "dafs"}, ...], "tokens": {token: [book positions]}}, generated
+# by dev/build_structure.py with book-name aliases. Queries are answered with token and daf
+# lookups; only the vocabulary (a few hundred tokens) is scanned for partial words.
+def normalize_text(text):
+    """Lowercases, folds accents and splits on anything that is not a letter or digit."""
+    folded = unicodedata.normalize('NFKD', text)
+    folded = ''.join(c for c in folded if not unicodedata.combining(c)).lower()
+    return re.findall(r'[a-z0-9]+', folded)
+
+def build_search_index(structure):
+    """Derives a search index (without aliases) from the full structure."""
+    books = []
+    tokens = {}
+    for seder_key, seder_data in structure.items():
+        for book_name, book_data in seder_data.get("books", {}).items():
+            book_idx = len(books)
+            dafs = [int(title.rsplit(' ', 1)[1]) for title in book_lessons(book_name, book_data)]
+            books.append({"seder": seder_key, "book": book_name, "dafs": dafs})
+            for token in normalize_text(book_name):
+                tokens.setdefault(token, []).append(book_idx)
+    return {"books": books, "tokens": tokens}
+
+def load_search_index():
+    """Returns the search index, deriving it from the full structure if the index file is unavailable."""
+    global _SEARCH_INDEX
+    if _SEARCH_INDEX is not None:
+        return _SEARCH_INDEX
+
+    try:
+        _SEARCH_INDEX = read_catalog_file(SEARCH_INDEX_FILE)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Search index unavailable ({e}). Deriving it from the structure file.", xbmc.LOGWARNING)
+        _SEARCH_INDEX = build_search_index(load_structure())
+    return _SEARCH_INDEX
+
+def find_lessons(query):
+    """Returns ranked (seder, book, daf) matches for a free-text query such as "kama 45".
+
+    Words select books (exact token, then prefix, then substring of a token, including
+    aliases) and numbers select dafs. Exact book + daf matches come first, then by
+    catalog order.
+    """
+    search_index = load_search_index()
+    books = search_index["books"]
+    tokens = search_index["tokens"]
+
+    words, dafs = [], set()
+    for token in normalize_text(query):
+        if token.isdigit():
+            dafs.add(int(token))
+        else:
+            words.append(token)
+    if not words and not dafs:
+        return []
+
+    # Best match quality per book: 0 exact, 1 prefix, 2 substring. Every word must match.
+    book_quality = None
+    for word in words:
+        word_matches = {}
+        for token, book_positions in tokens.items():
+            if token == word:
+                quality = 0
+            elif token.startswith(word):
+                quality = 1
+            elif len(word) >= 3 and word in token:
+                quality = 2
+            else:
+                continue
+            for book_idx in book_positions:
+                word_matches[book_idx] = min(quality, word_matches.get(book_idx, quality))
+
+        if book_quality is None:
+            book_quality = word_matches
+        else:
+            book_quality = {b: q + word_matches[b] for b, q in book_quality.items() if b in word_matches}
+        if not book_quality:
+            return []
+
+    if book_quality is None: # Only numbers: every book is a candidate
+        book_quality = dict.fromkeys(range(len(books)), 0)
+
+    ranked = []
+    for book_idx, quality in book_quality.items():
+        entry = books[book_idx]
+        book_dafs = [daf for daf in entry["dafs"] if daf in dafs] if dafs else entry["dafs"]
+        for daf in book_dafs:
+            ranked.append(((quality, book_idx, daf), entry["seder"], entry["book"], daf))
+
+    ranked.sort(key=lambda match: match[0])
+    return [(seder, book, daf) for _, seder, book, daf in ranked]
+
+
+# --- Catalog Access Layer ---
+# The routes only talk to the catalog through these functions. When the optional SQLite
+# catalog is shipped each call is a single indexed query reading only the rows displayed;
+# otherwise (or on any database error) they are answered from the JSON files above.
+def open_catalog_db():
+    """Returns a read-only connection to the SQLite catalog, or None if it is not available."""
+    global _CATALOG_DB
+    if _CATALOG_DB is None:
+        _CATALOG_DB = False
+        if os.path.isfile(CATALOG_DB_FILE):
+            import urllib.request # Only for pathname2url; it pulls in http.client, slow to import
+            try:
+                db_uri = f"file:{urllib.request.pathname2url(CATALOG_DB_FILE)}?mode=ro"
+                _CATALOG_DB = sqlite3.connect(db_uri, uri=True)
+                xbmc.log("[Guemara] Using SQLite catalog", xbmc.LOGINFO)
+            except sqlite3.Error as e:
+                xbmc.log(f"[Guemara] Could not open SQLite catalog '{CATALOG_DB_FILE}': {e}", xbmc.LOGWARNING)
+    return _CATALOG_DB or None
+
+def _query_catalog_db(sql, params=()):
+    """Runs a query on the SQLite catalog. Returns None when the JSON catalog must be used instead."""
+    db = open_catalog_db()
+    if not db:
+        return None
+    try:
+        with timed('db_query'):
+            return db.execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        xbmc.log(f"[Guemara] SQLite catalog query failed ({e}). Falling back to JSON catalog.", xbmc.LOGWARNING)
+        return None
+
+def catalog_version(refresh=False):
+    """Returns a short stamp that changes exactly when a catalog with different content ships."""
+    global _CATALOG_VERSION
+    if _CATALOG_VERSION is None or refresh:
+        f = xbmcvfs.File(CATALOG_VERSION_FILE)
+        _CATALOG_VERSION = f.read().strip()
+        f.close()
+        if not _CATALOG_VERSION:
+            # No version file (older catalog build): use the structure file's size and mtime
+            try:
+                st = os.stat(STRUCTURE_FILE)
+                _CATALOG_VERSION = f"{st.st_size:x}{int(st.st_mtime):x}"
+            except OSError:
+                _CATALOG_VERSION = '0'
+    return _CATALOG_VERSION
+
+def artwork_path(path, fallback=None):
+    """Returns the local path of a catalog image shipped with the addon, or `fallback` if it is missing.
+
+    Catalog images are stored relative to the addon folder ('resources/images/...'), see
+    dev/build_artwork.py; full URLs are returned unchanged.
+    """
+    if not path or '://' in path:
+        return path or fallback
+    local_path = os.path.join(ADDON_PATH, *path.split('/'))
+    return local_path if os.path.exists(local_path) else fallback
+
+def catalog_sedarim():
+    """Returns [(seder, description, thumb)] in catalog order."""
+    rows = _query_catalog_db("SELECT name, description, thumb, thumb_url FROM sedarim ORDER BY position")
+    if rows is None:
+        rows = [(seder, data.get("description", ""), data.get("thumb"), data.get("thumb_url"))
+                for seder, data in load_index().items()]
+    return [(seder, description, artwork_path(thumb, thumb_url)) for seder, description, thumb, thumb_url in rows]
+
+def catalog_books(seder):
+    """Returns [(book, description, lesson_count, thumb)] of a Seder in catalog order (thumb may be None)."""
+    rows = _query_catalog_db(
+        "SELECT b.name, b.description, b.lesson_count, b.thumb FROM books b JOIN sedarim s ON s.id = b.seder_id "
+        "WHERE s.name = ? ORDER BY b.position", (seder,))
+    if rows is None:
+        books = load_index().get(seder, {}).get("books", {})
+        rows = [(book, data.get("description", ""), data.get("lessons", 0), data.get("thumb")) for book, data in books.items()]
+    return [(book, description, lesson_count, artwork_path(thumb)) for book, description, lesson_count, thumb in rows]
+
+def catalog_lesson_count(seder, book):
+    """Returns the number of lessons of a book without reading them."""
+    rows = _query_catalog_db("SELECT lesson_count FROM books WHERE name = ?", (book,))
+    if rows is not None:
+        return rows[0][0] if rows else 0
+    return load_index().get(seder, {}).get("books", {}).get(book, {}).get("lessons", 0)
+
+def catalog_lessons(seder, book, start=0, count=None):
+    """Returns [(title, url)] of a book in catalog order, optionally only `count` lessons from `start`."""
+    rows = _query_catalog_db(
+        "SELECT l.title, l.url FROM lessons l JOIN books b ON b.id = l.book_id "
+        "WHERE b.name = ? ORDER BY l.position LIMIT ? OFFSET ?",
+        (book, -1 if count is None else count, start))
+    if rows is not None:
+        return rows
+    lessons = load_lessons(seder, book)
+    if isinstance(lessons, BookLessons):
+        # Only the requested page is decoded
+        return list(lessons.items(start, None if count is None else start + count))
+    return list(itertools.islice(lessons.items(), start, None if count is None else start + count))
+
+def make_lesson_id(book, title):
+    """Returns the short, stable ID of a lesson used in play URLs, e.g. 'Baba_Kama.45'."""
+    return f"{book.replace(' ', '_')}.{title.rsplit(' ', 1)[-1]}"
+
+def load_book_lessons(book):
+    """Returns the lessons of a book (see BookLessons) by name alone, reading the shard named after it."""
+    shard_path = os.path.join(CATALOG_DIR, 'shards', f"{book.replace(' ', '_')}.json")
+    try:
+        return book_lessons(book, read_catalog_file(shard_path))
+    except Exception as e:
+        xbmc.log(f"[Guemara] Shard for book '{book}' unavailable ({e}). Falling back to the structure file.", xbmc.LOGWARNING)
+        return next((book_lessons(book, seder_data["books"][book])
+                     for seder_data in load_structure().values() if book in seder_data.get("books", {})), {})
+
+def catalog_resolve(lesson_id):
+    """Returns (title, url) for a lesson ID, or (None, None) if it is not in the catalog.
+
+    The book part of the ID is also the name of its shard, so this reads a single shard
+    (or runs a single indexed query) without loading the manifest.
+    """
+    slug, _, daf = lesson_id.rpartition('.')
+    book = slug.replace('_', ' ')
+    title = f"{book} {daf}"
+    if not slug or not daf.isdigit():
+        return None, None
+
+    rows = _query_catalog_db(
+        "SELECT l.url FROM lessons l JOIN books b ON b.id = l.book_id WHERE b.name = ? AND l.daf = ?",
+        (book, int(daf)))
+    if rows is not None:
+        return (title, rows[0][0]) if rows else (None, None)
+
+    url = load_book_lessons(book).get(title)
+    return (title, url) if url else (None, None)
+
+def catalog_following(lesson_id, count):
+    """Returns [(title, url)] of up to `count` lessons that follow a lesson ID in its book."""
+    slug, _, daf = lesson_id.rpartition('.')
+    book = slug.replace('_', ' ')
+    if not slug or not daf.isdigit():
+        return []
+
+    rows = _query_catalog_db(
+        "SELECT l.title, l.url FROM lessons l JOIN books b ON b.id = l.book_id "
+        "WHERE b.name = ? AND l.daf > ? ORDER BY l.position LIMIT ?",
+        (book, int(daf), count))
+    if rows is not None:
+        return rows
+
+    lessons = load_book_lessons(book)
+    title = f"{book} {daf}"
+    if isinstance(lessons, BookLessons):
+        index = lessons.index(title)
+        return list(lessons.items(index + 1, index + 1 + count)) if index >= 0 else []
+    lesson_items = iter(lessons.items())
+    for lesson_title, _ in lesson_items: # Skip up to and including the given lesson
+        if lesson_title == title:
+            return list(itertools.islice(lesson_items, count))
+    return []
+
+def catalog_search(query):
+    """Returns ranked [(seder, book, title, url)] matches for a free-text query.
+
+    The matches and their order always come from find_lessons(), so that the SQLite catalog
+    gives the same results as the JSON one; it is only used to read their URLs in one query.
+    """
+    matches = find_lessons(query)
+    if not matches:
+        return []
+
+    books = sorted({book for _, book, _ in matches})
+    rows = _query_catalog_db(
+        "SELECT b.name, l.daf, l.url FROM lessons l JOIN books b ON b.id = l.book_id "
+        f"WHERE b.name IN ({','.join('?' * len(books))})", books)
+    if rows is not None:
+        urls = {(book, daf): url for book, daf, url in rows}
+        return [(seder, book, f"{book} {daf}", urls[book, daf]) for seder, book, daf in matches if (book, daf) in urls]
+
+    results = []
+    for seder, book, daf in matches:
+        title = f"{book} {daf}"
+        direct_url = load_lessons(seder, book).get(title)
+        if direct_url:
+            results.append((seder, book, title, direct_url))
+    return results
+
+
+# --- Progress Store ---
+# Study progress lives in a small SQLite table in the profile, one row per lesson played,
+# keyed by lesson ID. Everything the UI needs is one indexed query away: the most recent
+# row for "Continuar" and the rows of one book for the watched markers of its listing.
+_PROGRESS_DB = None
+
+def open_progress_db(create=False):
+    """Returns a connection to the progress store, or None if it does not exist (and create is False)."""
+    global _PROGRESS_DB
+    if _PROGRESS_DB is None:
+        if not create and not os.path.exists(PROGRESS_DB_FILE):
+            return None
+        os.makedirs(ADDON_PROFILE, exist_ok=True)
+        _PROGRESS_DB = sqlite3.connect(PROGRESS_DB_FILE, timeout=5)
+        _PROGRESS_DB.executescript(
+            "CREATE TABLE IF NOT EXISTS progress ("
+            " lesson_id TEXT PRIMARY KEY, book TEXT NOT NULL, position REAL NOT NULL DEFAULT 0,"
+            " total REAL NOT NULL DEFAULT 0, watched INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS progress_book ON progress (book);"
+            "CREATE INDEX IF NOT EXISTS progress_updated ON progress (updated);")
+    return _PROGRESS_DB
+
+def save_progress(lesson_id, position=0.0, total=0.0):
+    """Records the playback position of a lesson, marking it watched past WATCHED_THRESHOLD."""
+    watched = bool(total) and position >= total * WATCHED_THRESHOLD
+    try:
+        conn = open_progress_db(create=True)
+        with conn:
+            # A lesson once watched stays watched when it is replayed
+            conn.execute(
+                "INSERT INTO progress (lesson_id, book, position, total, watched, updated) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (lesson_id) DO UPDATE SET position = excluded.position, total = excluded.total, "
+                "watched = MAX(watched, excluded.watched), updated = excluded.updated",
+                (lesson_id, lesson_id.rpartition('.')[0], 0.0 if watched else position, total, int(watched), time.time()))
+    except sqlite3.Error as e:
+        xbmc.log(f"[Guemara] Could not save progress of '{lesson_id}': {e}", xbmc.LOGWARNING)
+
+def book_progress(book):
+    """Returns {lesson_id: (position, total, watched)} for the lessons of a book played so far."""
+    try:
+        conn = open_progress_db()
+        if conn is None:
+            return {}
+        rows = conn.execute("SELECT lesson_id, position, total, watched FROM progress WHERE book = ?",
+                            (book.replace(' ', '_'),)).fetchall()
+    except sqlite3.Error as e:
+        xbmc.log(f"[Guemara] Could not read progress of '{book}': {e}", xbmc.LOGWARNING)
+        return {}
+    return {lesson_id: (position, total, bool(watched)) for lesson_id, position, total, watched in rows}
+
+def continue_lesson():
+    """Returns (lesson_id, title, resume position) of the lesson to continue studying, or None.
+
+    That is the lesson played last if it was left half way, otherwise the first unwatched
+    daf after it, moving on to the following masechtot in catalog order (and from the last
+    one back to the first) when the rest of its masejta is watched.
+    """
+    try:
+        conn = open_progress_db()
+        row = conn and conn.execute(
+            "SELECT lesson_id, position, watched FROM progress ORDER BY updated DESC LIMIT 1").fetchone()
+        if not row:
+            return None
+        lesson_id, position, watched = row
+        slug, _, daf = lesson_id.rpartition('.')
+        if not watched:
+            return lesson_id, f"{slug.replace('_', ' ')} {daf}", position
+        # Skip dafim already watched (e.g. when a masejta is being reviewed)
+        watched_ids = {r[0] for r in conn.execute("SELECT lesson_id FROM progress WHERE watched = 1")}
+    except sqlite3.Error as e:
+        xbmc.log(f"[Guemara] Could not read the progress store: {e}", xbmc.LOGWARNING)
+        return None
+
+    book = slug.replace('_', ' ')
+    books = [(seder, name) for seder, _, _ in catalog_sedarim() for name, _, _, _ in catalog_books(seder)]
+    start = next((i for i, (_, name) in enumerate(books) if name == book), None)
+    if start is None: # No longer in the catalog
+        start, daf = 0, '0'
+    # Its own masejta comes again last, for the dafim before the one just watched
+    for i, (seder, name) in enumerate(books[start:] + books[:start + 1]):
+        for title, _ in catalog_lessons(seder, name):
+            if i == 0 and int(title.rsplit(' ', 1)[-1]) <= int(daf):
+                continue
+            next_id = make_lesson_id(name, title)
+            if next_id not in watched_ids:
+                return next_id, title, 0.0
+    return None # Everything watched
+
+
+# --- Daf Yomi ---
+# The widgets below are polled by skins on every home screen refresh, so they read neither
+# the manifest nor a shard: the daf of a date comes from the small cycle table written by
+# dev/build_structure.py, and the finished rows are kept for a few minutes in the profile.
+def daf_yomi(date):
+    """Returns (seder, book, daf, thumb) of the Daf Yomi on a date, or None without a cycle table."""
+    try:
+        table = read_catalog_file(DAF_YOMI_FILE)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Daf Yomi table unavailable: {e}", xbmc.LOGWARNING)
+        return None
+    day = (date - datetime.date.fromisoformat(table["start"])).days % table["days"]
+    first_day, seder, book, first_daf, thumb = next(row for row in reversed(table["masechtot"]) if row[0] <= day)
+    return seder, book, first_daf + day - first_day, thumb
+
+def read_widget_cache(key):
+    """Returns the cached rows of a widget, or None if there are none or they expired."""
+    try:
+        with open(WIDGET_CACHE_FILE, encoding='utf-8') as f:
+            entry = json.load(f).get(key)
+    except (OSError, ValueError):
+        return None
+    return entry['rows'] if entry and entry['expires'] > time.time() else None
+
+def write_widget_cache(key, rows):
+    try:
+        with open(WIDGET_CACHE_FILE, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    # The daf changes at midnight, whatever the TTL
+    midnight = datetime.datetime.combine(datetime.date.today() + datetime.timedelta(days=1), datetime.time())
+    cache[key] = {'expires': min(time.time() + WIDGET_CACHE_TTL, midnight.timestamp()), 'rows': rows}
+    try:
+        tmp_path = f"{WIDGET_CACHE_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, WIDGET_CACHE_FILE)
+    except OSError as e:
+        xbmc.log(f"[Guemara] Could not write the widget cache: {e}", xbmc.LOGWARNING)
 
 
 # --- Helper Functions ---
+_ADDON = None
+
+def get_setting(setting_id):
+    """Returns an addon setting as a string ('' if unavailable)."""
+    global _ADDON
+    try:
+        if _ADDON is None:
+            _ADDON = xbmcaddon.Addon(ADDON_ID)
+        return _ADDON.getSetting(setting_id)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Could not read setting '{setting_id}': {e}", xbmc.LOGWARNING)
+        return ''
+
+def reload_settings():
+    """Makes the next get_setting() read the current settings (for service.py, which runs for the whole session)."""
+    global _ADDON
+    _ADDON = None
+
+def set_setting(setting_id, value):
+    """Stores an addon setting (string value); failures are only logged."""
+    try:
+        if _ADDON is None:
+            get_setting(setting_id) # Creates the Addon instance
+        _ADDON.setSetting(setting_id, value)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Could not store setting '{setting_id}': {e}", xbmc.LOGWARNING)
+
+def get_setting_bool(setting_id, default=False):
+    """Returns a boolean addon setting."""
+    value = get_setting(setting_id)
+    return value == 'true' if value else default
+
+def get_setting_int(setting_id, default=0):
+    """Returns an integer addon setting."""
+    try:
+        return int(get_setting(setting_id))
+    except ValueError:
+        return default
+
 def build_url(query_dict):
     """Encodes a dictionary into a URL query string for the plugin."""
     return f"{BASE_URL}?{urllib.parse.urlencode(query_dict)}"
 
-def create_listitem(title, plot="", is_folder=False, is_playable=False, icon=None, thumb=None):
-    """General helper function to create a ListItem."""
-    # TODO - natively https://forum.kodi.tv/showthread.php?tid=369255&pid=3107800#pid3107800
-    # or using this convenient module: https://github.com/jurialmunkey/script.module.infotagger
-    # DEBUG prints: "Setting most video properties through ListItem.setInfo() is deprecated and
-    # might be removed in future Kodi versions. Please use the respective setter in InfoTagVideo"
-    li = xbmcgui.ListItem(label=title)
-    info = {'title': title, 'plot': plot}
-    if is_playable:
-        info['mediatype'] = 'video'
-        li.setProperty('IsPlayable', 'true')
-    else:
-         # Keep mediatype video for folders too if desired, some skins use it
-         info['mediatype'] = 'video'
+def paging_page_size():
+    """Returns the configured page size for lesson listings, or 0 when paging is disabled."""
+    if not get_setting_bool('paging'):
+        return 0
+    return max(get_setting_int('page_size', 50), 10)
+
+def build_catalog_url(query_dict):
+    """Builds the URL of a catalog folder, stamped with the catalog version.
+
+    Catalog listings are deterministic for a given stamp, so Kodi may cache them to disc:
+    a new catalog (or a different paging setting) changes every URL and thereby
+    invalidates the cached listings.
+    """
+    stamp = catalog_version()
+    page_size = paging_page_size()
+    if page_size:
+        stamp = f"{stamp}.p{page_size}"
+    return build_url({**query_dict, 'v': stamp})
 
-    li.setInfo('video', info)
+# InfoTagVideo setters exist from Kodi 20 (Nexus); older versions still need ListItem.setInfo()
+USE_INFOTAG = hasattr(getattr(xbmc, 'InfoTagVideo', None), 'setTitle')
 
-    # --- Icon Logic Modification ---
+def listitem_art(icon=None, thumb=None, is_playable=False):
+    """Returns the art dict for a ListItem, applying the default icon/thumb fallbacks."""
     icon_to_use = icon  # Use the passed icon if available
     if not icon_to_use: # Fallback to defaults only if no icon was passed
         if is_playable:
@@ -91,13 +859,72 @@ def create_listitem(title, plot="", is_folder=False, is_playable=False, icon=Non
     art = {'icon': icon_to_use}
     if thumb:
         art['thumb'] = thumb
-    # Optional: If you want the thumb to default to the icon when no specific thumb is available:
-    elif not thumb and icon_to_use != 'DefaultFolder.png' and icon_to_use != 'DefaultMovies.png':
+    # The thumb defaults to the icon when no specific thumb is available (except generic icons)
+    elif icon_to_use != 'DefaultFolder.png' and icon_to_use != 'DefaultMovies.png':
         art['thumb'] = icon_to_use
-    li.setArt(art)
+    return art
 
+def _new_listitem(title, plot, art, is_playable):
+    """Creates an offscreen ListItem with video info and the given (shared) art dict."""
+    li = xbmcgui.ListItem(label=title, offscreen=True)
+    if USE_INFOTAG:
+        info_tag = li.getVideoInfoTag()
+        info_tag.setTitle(title)
+        info_tag.setPlot(plot)
+        # Keep mediatype video for folders too, some skins use it
+        info_tag.setMediaType('video')
+    else:
+        li.setInfo('video', {'title': title, 'plot': plot, 'mediatype': 'video'})
+    if is_playable:
+        li.setProperty('IsPlayable', 'true')
+    li.setArt(art)
     return li
 
+def create_listitem(title, plot="", is_folder=False, is_playable=False, icon=None, thumb=None):
+    """General helper function to create a ListItem."""
+    with timed('listitems'):
+        return _new_listitem(title, plot, listitem_art(icon, thumb, is_playable), is_playable)
+
+def build_playable_items(entries, icon=None, thumb=None):
+    """Builds the (url, ListItem, isFolder) tuples for a whole listing of playable items in one pass.
+
+    `entries` yields (url, title, plot), optionally followed by the row's context menu items.
+    The art is resolved once for the whole listing instead of once per row, which matters for
+    books with hundreds of lessons.
+    """
+    art = listitem_art(icon, thumb, is_playable=True)
+    items = []
+    with timed('listitems'):
+        for url, title, plot, *context_menu in entries:
+            li = _new_listitem(title, plot, art, True)
+            if context_menu and context_menu[0]:
+                li.addContextMenuItems(context_menu[0])
+            items.append((url, li, False))
+    return items
+
+def apply_progress(items, lesson_ids, progress):
+    """Marks the lesson rows of a listing as watched or in progress, from book_progress()."""
+    for (_, li, _), lesson_id in zip(items, lesson_ids):
+        state = progress.get(lesson_id)
+        if not state:
+            continue
+        position, total, watched = state
+        if USE_INFOTAG:
+            info_tag = li.getVideoInfoTag()
+            if watched:
+                info_tag.setPlaycount(1)
+            elif position:
+                info_tag.setResumePoint(position, total)
+        elif watched:
+            li.setInfo('video', {'playcount': 1})
+        elif position:
+            li.setProperty('ResumeTime', str(position))
+            li.setProperty('TotalTime', str(total))
+
+def play_from_menu(lesson_id):
+    """Returns the context menu of a lesson row, to play its masejta from that daf on."""
+    return [("Reproducir masejta desde aquí", f"RunPlugin({build_url({'action': 'play_from', 'id': lesson_id})})")]
+
 # --- Listing Functions ---
 def list_sedarim():
     """Lists the main categories (Sedarim) and the Search option."""
@@ -110,19 +937,30 @@ def list_sedarim():
     items.append((search_url, search_li, True))
     xbmc.log("[Guemara] Added Search item", xbmc.LOGDEBUG)
 
-    # 2. Add Sedarim Items
-    if not GUEMARA_STRUCTURE:
-        xbmc.log("[Guemara] GUEMARA_STRUCTURE is empty or not loaded.", xbmc.LOGWARNING)
-    else:
-        # Iterate using JSON order
-        for seder_key in GUEMARA_STRUCTURE.keys():
-            seder_data = GUEMARA_STRUCTURE.get(seder_key, {})
+    # Continue studying: resume the last lesson or play the next unwatched daf
+    next_lesson = continue_lesson()
+    if next_lesson:
+        lesson_id, title, resume_position = next_lesson
+        continue_query = {'action': 'play', 'id': lesson_id}
+        if resume_position:
+            continue_query['start'] = int(resume_position)
+        continue_li = create_listitem(f"Continuar: {title}", plot="Seguir estudiando donde lo dejaste", is_playable=True, icon='DefaultInProgressShows.png')
+        continue_li.addContextMenuItems(play_from_menu(lesson_id))
+        items.append((build_url(continue_query), continue_li, False))
+
+    # Daf Yomi folder, also a source of widget paths for skins
+    daf_yomi_li = create_listitem("Daf Yomi", plot="La daf de hoy y la siguiente del ciclo del Daf Yomi", is_folder=True, icon='DefaultYear.png')
+    items.append((build_url({'action': 'daf_yomi'}), daf_yomi_li, True))
 
+    # 2. Add Sedarim Items (only the index is needed here)
+    sedarim = catalog_sedarim()
+    if not sedarim:
+        xbmc.log("[Guemara] Catalog index is empty or not loaded.", xbmc.LOGWARNING)
+    else:
+        # Iterate using catalog order
+        for seder_key, seder_description, seder_thumb_url in sedarim:
             display_name = f"Seder {seder_key}"
-            seder_description = seder_data.get("description", "") # Get description from Seder data
-            # Get the specific thumbnail URL from the Seder's data in the JSON
-            seder_thumb_url = seder_data.get("thumb") # Returns None if "thumb" key doesn't exist
-            seder_url = build_url({'action': 'list_books', 'seder': seder_key})
+            seder_url = build_catalog_url({'action': 'list_books', 'seder': seder_key})
 
             seder_li = create_listitem(
                 title=display_name,
@@ -140,31 +978,62 @@ def list_sedarim():
         if len(items) <= 1: # Only search item exists
              xbmcgui.Dialog().notification("Guemara", "No content categories found.", xbmcgui.NOTIFICATION_INFO, 3000)
 
-    xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=items, totalItems=len(items))
-    xbmcplugin.endOfDirectory(ADDON_HANDLE)
+    with timed('addDirectoryItems'):
+        xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=items, totalItems=len(items))
+    xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_UNSORTED)
+    # The root URL is fixed by Kodi and cannot carry the catalog stamp, so it is not cached
+    with timed('endOfDirectory'):
+        xbmcplugin.endOfDirectory(ADDON_HANDLE, cacheToDisc=False)
     xbmc.log("[Guemara] list_sedarim() finished", xbmc.LOGINFO)
 
 
+def list_daf_yomi(days, cache_key):
+    """Lists the Daf Yomi of today and/or the next day (`days` are offsets from today) as playable items."""
+    rows = read_widget_cache(cache_key)
+    if rows is None:
+        rows = []
+        today = datetime.date.today()
+        for offset in days:
+            date = today + datetime.timedelta(days=offset)
+            lesson = daf_yomi(date)
+            if not lesson:
+                continue
+            seder, book, daf, thumb = lesson
+            label = "Daf Yomi de hoy" if offset == 0 else "Siguiente daf"
+            rows.append([f"{label}: {book} {daf}", make_lesson_id(book, f"{book} {daf}"),
+                         f"Daf Yomi del {date:%d/%m/%Y}. Tratado de {book}, Seder {seder}", artwork_path(thumb)])
+        write_widget_cache(cache_key, rows)
+
+    items = []
+    for title, lesson_id, plot, thumb in rows:
+        items.extend(build_playable_items(
+            [(build_url({'action': 'play', 'id': lesson_id}), title, plot, play_from_menu(lesson_id))],
+            icon='DefaultMovies.png', thumb=thumb))
+
+    with timed('addDirectoryItems'):
+        xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=items, totalItems=len(items))
+    xbmcplugin.setPluginCategory(ADDON_HANDLE, "Daf Yomi")
+    xbmcplugin.setContent(ADDON_HANDLE, 'episodes')
+    # Changes every day under the same URL
+    with timed('endOfDirectory'):
+        xbmcplugin.endOfDirectory(ADDON_HANDLE, cacheToDisc=False)
+
+
 def list_books(seder):
     """Lists books under a specific Seder."""
     xbmc.log(f"[Guemara] Listing books for Seder '{seder}'", xbmc.LOGINFO)
-    seder_data = GUEMARA_STRUCTURE.get(seder, {})
-    books = seder_data.get("books", {})
     items = []
 
-    # Iterate using JSON order
-    for book_name in books.keys():
-        book_data = books.get(book_name, {}) # Get book data to potentially read thumb from JSON later if needed
-        book_description = book_data.get("description", "")
-        # book_thumb_path = book_data.get("thumb") # TODO if reading from JSON
-        book_url = build_url({'action': 'list_lessons', 'seder': seder, 'book': book_name})
+    # Iterate using catalog order
+    for book_name, book_description, _, book_thumb in catalog_books(seder):
+        book_url = build_catalog_url({'action': 'list_lessons', 'seder': seder, 'book': book_name})
 
         book_li = create_listitem(
             title=book_name,
             plot=book_description,
             is_folder=True,
             icon='DefaultVideoPlaylists.png',
-            thumb='DefaultVideoPlaylists.png'
+            thumb=book_thumb or 'DefaultVideoPlaylists.png' # Local thumb from build_artwork.py, if shipped
         )
         items.append((book_url, book_li, True))
         xbmc.log(f"[Guemara] Added book: {book_name}", xbmc.LOGDEBUG)
@@ -173,46 +1042,102 @@ def list_books(seder):
         xbmc.log(f"[Guemara] No books found for Seder '{seder}'", xbmc.LOGWARNING)
         xbmcgui.Dialog().notification("Guemara", f"No se encontraron libros en {seder}", xbmcgui.NOTIFICATION_INFO, 3000)
 
-    xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=items, totalItems=len(items))
+    with timed('addDirectoryItems'):
+        xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=items, totalItems=len(items))
+    xbmcplugin.setPluginCategory(ADDON_HANDLE, f"Seder {seder}")
     xbmcplugin.setContent(ADDON_HANDLE, 'tvshows')
-    xbmcplugin.endOfDirectory(ADDON_HANDLE)
+    xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_UNSORTED) # Canonical order
+    xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_LABEL)
+    with timed('endOfDirectory'):
+        xbmcplugin.endOfDirectory(ADDON_HANDLE, cacheToDisc=True)
     xbmc.log(f"[Guemara] list_books() finished for Seder '{seder}'", xbmc.LOGINFO)
 
-def list_lessons(seder, book):
-    """Lists playable lessons for a specific Seder and Book."""
-    xbmc.log(f"[Guemara] Listing lessons for Book '{book}' in Seder '{seder}'", xbmc.LOGINFO)
-    lessons = GUEMARA_STRUCTURE.get(seder, {}).get("books", {}).get(book, {}).get("lessons", {})
+def get_page_size(seder, book):
+    """Returns the page size to use for a book, or 0 when it is listed in a single page."""
+    page_size = paging_page_size()
+    return page_size if page_size and catalog_lesson_count(seder, book) > page_size else 0
+
+def list_lessons(seder, book, page=None):
+    """Lists playable lessons for a specific Seder and Book.
+
+    With paging enabled (addon settings) a book longer than the page size is listed one
+    page at a time, with a jump-to-daf-range entry and a "Página siguiente" entry, so the
+    number of ListItems built per click does not depend on the length of the book.
+    """
+    xbmc.log(f"[Guemara] Listing lessons for Book '{book}' in Seder '{seder}' (page {page})", xbmc.LOGINFO)
     items = []
 
-    # Iterate through lessons (order is preserved from JSON)
-    for title, direct_url in lessons.items():
-        # Create the ListItem - marked as playable here
-        lesson_li = create_listitem(
-            title,
-            plot=f"Tratado de {book}, Seder {seder}",
-            is_playable=True,
-            icon='DefaultMovies.png',
-            thumb='DefaultMovies.png'
-        )
+    page_size = get_page_size(seder, book)
+    if page_size:
+        page = max(page or 1, 1)
+        lessons = catalog_lessons(seder, book, start=(page - 1) * page_size, count=page_size)
+        has_next_page = catalog_lesson_count(seder, book) > page * page_size
+        jump_url = build_catalog_url({'action': 'list_pages', 'seder': seder, 'book': book})
+        jump_li = create_listitem("Ir a dafim...", plot=f"Elegir un rango de dafim de {book}", is_folder=True, icon='DefaultFolder.png')
+        items.append((jump_url, jump_li, True))
+    else:
+        lessons = catalog_lessons(seder, book)
+        has_next_page = False
 
-        # *** Create a plugin URL that calls the 'play' action ***
-        # Pass the direct URL as an encoded parameter
-        play_plugin_url = build_url({'action': 'play', 'video_url': direct_url, 'title': title})
+    # Build every lesson row in one pass (catalog order), all sharing the same plot and art
+    plot = f"Tratado de {book}, Seder {seder}"
+    lesson_ids = [make_lesson_id(book, title) for title, _ in lessons]
+    # *** Plugin URLs call the 'play' action with the short lesson ID, not the direct URL ***
+    lesson_items = build_playable_items(
+        ((build_url({'action': 'play', 'id': lesson_id}), title, plot, play_from_menu(lesson_id))
+         for (title, _), lesson_id in zip(lessons, lesson_ids)),
+        icon='DefaultMovies.png',
+        thumb='DefaultMovies.png'
+    )
+    progress = book_progress(book)
+    if progress:
+        apply_progress(lesson_items, lesson_ids, progress)
+    items.extend(lesson_items)
+    xbmc.log(f"[Guemara] Added {len(lessons)} lesson items", xbmc.LOGDEBUG)
 
-        # Add the item with the plugin URL, not the direct URL
-        items.append((play_plugin_url, lesson_li, False)) # False indicates it's not a folder
-        xbmc.log(f"[Guemara] Added lesson item: {title} with plugin URL", xbmc.LOGDEBUG)
+    if has_next_page:
+        next_url = build_catalog_url({'action': 'list_lessons', 'seder': seder, 'book': book, 'page': page + 1})
+        next_li = create_listitem("Página siguiente", plot=f"Página {page + 1} de {book}", is_folder=True, icon='DefaultFolder.png')
+        items.append((next_url, next_li, True))
 
-    if not items:
+    if not lessons:
         xbmc.log(f"[Guemara] No lessons found for Book '{book}', Seder '{seder}'", xbmc.LOGWARNING)
         xbmcgui.Dialog().notification("Guemara", f"No se encontraron videos en {book}", xbmcgui.NOTIFICATION_INFO, 3000)
 
-    xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=items, totalItems=len(items))
+    with timed('addDirectoryItems'):
+        xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=items, totalItems=len(items))
+    xbmcplugin.setPluginCategory(ADDON_HANDLE, book)
     # Set content type
     xbmcplugin.setContent(ADDON_HANDLE, 'episodes') # Or 'videos'
-    xbmcplugin.endOfDirectory(ADDON_HANDLE)
+    xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_UNSORTED) # Daf order
+    # Watched markers can change with any lesson played while the URL stays the same, so
+    # lesson lists are only cached when progress is not tracked
+    with timed('endOfDirectory'):
+        xbmcplugin.endOfDirectory(ADDON_HANDLE, cacheToDisc=not get_setting_bool('track_progress', True))
     xbmc.log(f"[Guemara] list_lessons() finished for Book '{book}', Seder '{seder}'", xbmc.LOGINFO)
 
+def list_pages(seder, book):
+    """Lists the daf ranges (one per page) of a paged book to jump directly to one of them."""
+    xbmc.log(f"[Guemara] Listing pages for Book '{book}' in Seder '{seder}'", xbmc.LOGINFO)
+    page_size = get_page_size(seder, book) or catalog_lesson_count(seder, book) or 1
+    titles = [title for title, _ in catalog_lessons(seder, book)]
+    items = []
+
+    for page, start in enumerate(range(0, len(titles), page_size), start=1):
+        first_daf = titles[start].rsplit(' ', 1)[-1]
+        last_daf = titles[min(start + page_size, len(titles)) - 1].rsplit(' ', 1)[-1]
+        page_url = build_catalog_url({'action': 'list_lessons', 'seder': seder, 'book': book, 'page': page})
+        page_li = create_listitem(f"{book} {first_daf} - {last_daf}", plot=f"Tratado de {book}, Seder {seder}", is_folder=True)
+        items.append((page_url, page_li, True))
+
+    with timed('addDirectoryItems'):
+        xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=items, totalItems=len(items))
+    xbmcplugin.setPluginCategory(ADDON_HANDLE, book)
+    xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_UNSORTED)
+    with timed('endOfDirectory'):
+        xbmcplugin.endOfDirectory(ADDON_HANDLE, cacheToDisc=True)
+    xbmc.log(f"[Guemara] list_pages() finished for Book '{book}', Seder '{seder}'", xbmc.LOGINFO)
+
 
 # --- Action Functions ---
 def search_dialog():
@@ -226,26 +1151,14 @@ def search_dialog():
         return
 
     xbmc.log(f"[Guemara] Searching for: '{query}'", xbmc.LOGINFO)
-    results = []
-    query_lower = query.lower()
-
-    for seder, seder_data in GUEMARA_STRUCTURE.items():
-        for book, book_data in seder_data.get("books", {}).items():
-            for title, direct_url in book_data.get("lessons", {}).items():
-                if query_lower in title.lower():
-                    # Found a match
-                    result_li = create_listitem(
-                        title,
-                        plot=f"Resultado de búsqueda: {book}, Seder {seder}",
-                        is_playable=True,
-                        icon='DefaultAddonVideo.png',
-                        thumb='DefaultAddonVideo.png'
-                        # Add 'thumb' if available
-                    )
-                    # *** Create a plugin URL pointing to 'play' action ***
-                    play_plugin_url = build_url({'action': 'play', 'video_url': direct_url, 'title': title})
-                    results.append((play_plugin_url, result_li, False))
-                    xbmc.log(f"[Guemara] Found search result: {title}", xbmc.LOGDEBUG)
+    results = build_playable_items(
+        # *** Plugin URLs point to the 'play' action with the short lesson ID ***
+        ((build_url({'action': 'play', 'id': lesson_id}), title, f"Resultado de búsqueda: {book}, Seder {seder}", play_from_menu(lesson_id))
+         for seder, book, title, lesson_id in ((seder, book, title, make_lesson_id(book, title)) for seder, book, title, _ in catalog_search(query))),
+        icon='DefaultAddonVideo.png',
+        thumb='DefaultAddonVideo.png'
+    )
+    xbmc.log(f"[Guemara] Found {len(results)} search results", xbmc.LOGDEBUG)
 
     if not results:
         xbmc.log("[Guemara] No search results found.", xbmc.LOGINFO)
@@ -254,49 +1167,144 @@ def search_dialog():
         xbmcplugin.endOfDirectory(ADDON_HANDLE, succeeded=True, cacheToDisc=False)
         return
 
-    xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=results, totalItems=len(results))
+    with timed('addDirectoryItems'):
+        xbmcplugin.addDirectoryItems(handle=ADDON_HANDLE, items=results, totalItems=len(results))
     xbmcplugin.setContent(ADDON_HANDLE, 'videos')
-    xbmcplugin.endOfDirectory(ADDON_HANDLE)
+    xbmcplugin.addSortMethod(ADDON_HANDLE, xbmcplugin.SORT_METHOD_UNSORTED) # Ranked order
+    # Results depend on the query typed, never serve them from the directory cache
+    with timed('endOfDirectory'):
+        xbmcplugin.endOfDirectory(ADDON_HANDLE, cacheToDisc=False)
     xbmc.log("[Guemara] search_dialog() finished displaying results.", xbmc.LOGINFO)
 
 
-def play_video(url, title=""):
-    """Resolves the final URL for playback using setResolvedUrl."""
-    xbmc.log(f"[Guemara] play_video() called for URL: {url}", xbmc.LOGINFO)
-    if not url:
-        xbmc.log("[Guemara] play_video() called with empty URL!", xbmc.LOGERROR)
-        xbmcgui.Dialog().notification("Guemara", "Error: No video URL provided", xbmcgui.NOTIFICATION_ERROR, 3000)
-        xbmcplugin.setResolvedUrl(handle=ADDON_HANDLE, succeeded=False, listitem=xbmcgui.ListItem())
-        return
-
-    # Create a simple ListItem needed for setResolvedUrl
+def create_playback_item(url, title):
+    """Creates the ListItem that points Kodi at a direct video URL (resolved or queued)."""
     # Pass the direct playable URL via 'path'
-    list_item = xbmcgui.ListItem(path=url)
+    list_item = xbmcgui.ListItem(label=title, path=url)
 
     # Optional: Set info labels again if needed, title is useful
-    list_item.setInfo('video', {'title': title})
+    if USE_INFOTAG:
+        list_item.getVideoInfoTag().setTitle(title)
+    else:
+        list_item.setInfo('video', {'title': title})
 
     # Optional: Set properties like MIME type if known
     if url.lower().endswith(".mp4"):
          list_item.setMimeType("video/mp4")
+    return list_item
+
+def play_video(url, title="", start=0):
+    """Resolves the final URL for playback using setResolvedUrl, optionally from `start` seconds."""
+    xbmc.log(f"[Guemara] play_video() called for URL: {url}", xbmc.LOGINFO)
+    if not url:
+        xbmc.log("[Guemara] play_video() called with empty URL!", xbmc.LOGERROR)
+        xbmcgui.Dialog().notification("Guemara", "Error: No video URL provided", xbmcgui.NOTIFICATION_ERROR, 3000)
+        xbmcplugin.setResolvedUrl(handle=ADDON_HANDLE, succeeded=False, listitem=xbmcgui.ListItem())
+        return
+
+    list_item = create_playback_item(url, title)
+    if start:
+        list_item.setProperty('StartOffset', str(start))
 
     xbmc.log(f"[Guemara] Calling setResolvedUrl with path: {url}", xbmc.LOGDEBUG)
     # Send the resolved URL to Kodi
-    xbmcplugin.setResolvedUrl(handle=ADDON_HANDLE, succeeded=True, listitem=list_item)
+    with timed('setResolvedUrl'):
+        xbmcplugin.setResolvedUrl(handle=ADDON_HANDLE, succeeded=True, listitem=list_item)
     xbmc.log("[Guemara] setResolvedUrl called successfully.", xbmc.LOGINFO)
 
 
-# --- Main Router ---
-def run():
-    """Main entry point and router."""
-    # Parse query string provided by Kodi
-    raw_params = sys.argv[2][1:] # Get query string without '?'
-    params = urllib.parse.parse_qs(raw_params)
-    xbmc.log(f"[Guemara] Router received params: {params}", xbmc.LOGDEBUG)
+# --- Playback Queue ---
+# Continuous playback runs from Kodi's video playlist. Each top-up appends the next few
+# dafim: all but the last with their direct URL, so Kodi starts them without calling the
+# addon at all, and the last one as a play URL flagged 'queue', which tops the playlist up
+# again when Kodi resolves it. One plugin invocation thus serves `queue_ahead` dafim.
+def queue_ahead():
+    """Returns how many dafim are kept queued ahead of the one playing."""
+    return min(max(get_setting_int('queue_ahead', 3), 1), 10)
 
-    # Get action, default to None for root view
-    action = params.get('action', [None])[0]
+def enqueue_following(lesson_id, playlist):
+    """Appends the dafim that follow a lesson to the playlist.
+
+    Returns {video URL: lesson ID} of the dafim queued with their direct URL.
+    """
+    book = lesson_id.rpartition('.')[0].replace('_', ' ')
+    following = catalog_following(lesson_id, queue_ahead())
+    queued = {}
+    for position, (title, url) in enumerate(following, start=1):
+        if position < len(following):
+            playlist.add(url, create_playback_item(url, title))
+            queued[url] = make_lesson_id(book, title)
+        else:
+            trigger_li = xbmcgui.ListItem(label=title, offscreen=True)
+            trigger_li.setProperty('IsPlayable', 'true')
+            playlist.add(build_url({'action': 'play', 'id': make_lesson_id(book, title), 'queue': 1}), trigger_li)
+    xbmc.log(f"[Guemara] Queued {len(following)} dafim after '{lesson_id}'", xbmc.LOGDEBUG)
+    return queued
+
+def top_up_queue(lesson_id):
+    """Called when a queued daf is resolved: queues the next dafim once the playlist runs out.
+
+    Returns {video URL: lesson ID} of the dafim queued with their direct URL.
+    """
+    playlist = xbmc.PlayList(xbmc.PLAYLIST_VIDEO)
+    if playlist.size() - playlist.getposition() - 1 > 0:
+        return {} # Still dafim ahead (e.g. the user went back in the playlist)
+    with timed('queue'):
+        return enqueue_following(lesson_id, playlist)
 
+# Progress is saved by service.py (ProgressTracker), which is running anyway, so that a
+# click returns as soon as its URL is resolved. The plugin only tells it which of the
+# videos about to play are our lessons, through a home window property.
+PLAYING_PROPERTY = 'plugin.video.guemara.playing'
+PLAYING_MAX = 50 # Lessons remembered, more than a few queued batches
+
+def register_playback(lessons):
+    """Hands {video URL: lesson ID} of the lessons about to play over to service.py."""
+    if not lessons or not get_setting_bool('track_progress', True):
+        return
+    window = xbmcgui.Window(SERVICE_WINDOW_ID)
+    try:
+        playing = json.loads(window.getProperty(PLAYING_PROPERTY) or '{}')
+    except ValueError:
+        playing = {}
+    for url in lessons:
+        playing.pop(url, None) # Re-added last, so the newest lessons are kept
+    playing.update(lessons)
+    window.setProperty(PLAYING_PROPERTY, json.dumps(dict(list(playing.items())[-PLAYING_MAX:])))
+
+def playing_lesson(url):
+    """Returns the lesson ID registered for a video URL by register_playback(), or None."""
+    raw = xbmcgui.Window(SERVICE_WINDOW_ID).getProperty(PLAYING_PROPERTY)
+    try:
+        return json.loads(raw).get(url) if raw else None
+    except ValueError:
+        return None
+
+def play_from(lesson_id, start=0):
+    """Plays a masejta through the video playlist, starting at the given lesson (from `start` seconds)."""
+    xbmc.log(f"[Guemara] play_from() called for lesson '{lesson_id}'", xbmc.LOGINFO)
+    with timed('resolve'):
+        title, url = catalog_resolve(lesson_id)
+    if not url:
+        xbmc.log(f"[Guemara] play_from(): unknown lesson ID '{lesson_id}'", xbmc.LOGERROR)
+        xbmcgui.Dialog().notification("Guemara", "Error: URL de video no encontrado", xbmcgui.NOTIFICATION_ERROR, 3000)
+        return
+
+    playlist = xbmc.PlayList(xbmc.PLAYLIST_VIDEO)
+    playlist.clear()
+    first_item = create_playback_item(url, title)
+    if start:
+        first_item.setProperty('StartOffset', str(start))
+    playlist.add(url, first_item)
+    with timed('queue'):
+        queued = enqueue_following(lesson_id, playlist)
+    register_playback({url: lesson_id, **queued})
+    xbmc.Player().play(playlist)
+
+
+# --- Main Router ---
+def route(action, params):
+    """Dispatches an action to its route."""
     try: # Add a top-level try-except for the router actions
         if action is None:
             list_sedarim()
@@ -311,18 +1319,62 @@ def run():
         elif action == 'list_lessons':
             seder = params.get('seder', [None])[0]
             book = params.get('book', [None])[0]
+            page = params.get('page', [None])[0]
             if seder and book:
-                list_lessons(seder, book)
+                list_lessons(seder, book, int(page) if page and page.isdigit() else None)
             else:
                 xbmc.log("[Guemara] Router Error: 'list_lessons' action missing 'seder' or 'book' param", xbmc.LOGERROR)
                 xbmcgui.Dialog().notification("Guemara", "Error: Seder o libro no especificado", xbmcgui.NOTIFICATION_ERROR, 3000)
                 xbmcplugin.endOfDirectory(ADDON_HANDLE, succeeded=False)
+        elif action == 'list_pages':
+            seder = params.get('seder', [None])[0]
+            book = params.get('book', [None])[0]
+            if seder and book:
+                list_pages(seder, book)
+            else:
+                xbmc.log("[Guemara] Router Error: 'list_pages' action missing 'seder' or 'book' param", xbmc.LOGERROR)
+                xbmcgui.Dialog().notification("Guemara", "Error: Seder o libro no especificado", xbmcgui.NOTIFICATION_ERROR, 3000)
+                xbmcplugin.endOfDirectory(ADDON_HANDLE, succeeded=False)
         elif action == 'search':
             search_dialog()
+        elif action in ('daf_yomi', 'daf_yomi_today', 'daf_yomi_next'):
+            # 'daf_yomi_today' and 'daf_yomi_next' are one-item lists meant as widgets
+            days = {'daf_yomi': (0, 1), 'daf_yomi_today': (0,), 'daf_yomi_next': (1,)}[action]
+            list_daf_yomi(days, action)
+        elif action == 'update_catalog':
+            from resources.lib import catalog_updates # Settings button: not compiled on the listings
+            catalog_updates.update_catalog_now()
+        elif action == 'export_library':
+            from resources.lib import library_export
+            library_export.export_library_now()
+        elif action == 'play_from':
+            lesson_id = params.get('id', [None])[0]
+            if lesson_id:
+                play_from(lesson_id)
+            else:
+                xbmc.log("[Guemara] Router Error: 'play_from' action missing 'id' param", xbmc.LOGERROR)
         elif action == 'play':
-            video_url_encoded = params.get('video_url', [None])[0]
+            lesson_id = params.get('id', [None])[0]
+            video_url_encoded = params.get('video_url', [None])[0] # Older favorites carry the full URL
             video_title = params.get('title', ["Video"])[0] # Get title if passed, fallback
-            if video_url_encoded:
+            queued = params.get('queue', [None])[0] == '1'
+            start = params.get('start', ['0'])[0]
+            start = int(start) if start.isdigit() else 0
+            if lesson_id and not queued and get_setting_bool('autoqueue'):
+                # Continuous playback: hand the click over to a playlist started at this daf
+                xbmcplugin.setResolvedUrl(handle=ADDON_HANDLE, succeeded=False, listitem=xbmcgui.ListItem())
+                play_from(lesson_id, start)
+            elif lesson_id:
+                with timed('resolve'):
+                    lesson_title, lesson_url = catalog_resolve(lesson_id)
+                if lesson_url:
+                    register_playback({lesson_url: lesson_id})
+                else:
+                    xbmc.log(f"[Guemara] Router Error: unknown lesson ID '{lesson_id}'", xbmc.LOGERROR)
+                play_video(lesson_url, lesson_title or video_title, start)
+                if lesson_url and queued:
+                    register_playback(top_up_queue(lesson_id))
+            elif video_url_encoded:
                 video_url_decoded = urllib.parse.unquote(video_url_encoded)
                 play_video(video_url_decoded, video_title)
                 # Note: play_video calls setResolvedUrl, so we don't call endOfDirectory here
@@ -340,13 +1392,40 @@ def run():
         xbmc.log(f"[Guemara] Unexpected error during action '{action}': {e}\n{error_details}", xbmc.LOGERROR)
         xbmcgui.Dialog().notification("Guemara", "An unexpected error occurred", xbmcgui.NOTIFICATION_ERROR, 5000)
         # Ensure directory listing ends even on unexpected error, unless it was during play
-        if action != 'play':
+        if action in ('play_from', 'update_catalog', 'export_library'):
+             pass # Run from a context menu or the settings: there is no directory or resolve to end
+        elif action != 'play':
              xbmcplugin.endOfDirectory(ADDON_HANDLE, succeeded=False)
         else:
              # If error during play action before setResolvedUrl, signal failure
              xbmcplugin.setResolvedUrl(handle=ADDON_HANDLE, succeeded=False, listitem=xbmcgui.ListItem())
 
 
+def run():
+    """Main entry point: parses the query string, routes it and records profiling data if enabled."""
+    # Parse query string provided by Kodi
+    raw_params = sys.argv[2][1:] # Get query string without '?'
+    params = urllib.parse.parse_qs(raw_params)
+    xbmc.log(f"[Guemara] Router received params: {params}", xbmc.LOGDEBUG)
+
+    # Get action, default to None for root view
+    action = params.get('action', [None])[0]
+
+    # A cProfile report is made for the next invocation only: the setting switches itself off
+    if get_setting_bool('profiling_cprofile'):
+        set_setting('profiling_cprofile', 'false')
+        from resources.lib import profiling
+        profiling.route_with_cprofile(action, params)
+    else:
+        route(action, params)
+
+    if get_setting_bool('profiling'):
+        from resources.lib import profiling
+        profiling.write_profiling_record(action, raw_params, time.perf_counter() - _START_TIME)
+
+
 # --- Execute ---
 if __name__ == '__main__':
-    run()
\ No newline at end of file
+    # The modules in resources/lib import addon: let them share this run instead of a second copy
+    sys.modules.setdefault('addon', sys.modules[__name__])
+    run()
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""Micro-benchmark of the ListItem construction for a lesson listing.
+
+Compares the per-item cost of the previous per-row create_listitem() + setInfo() with the
+full video URL in the play URL, against addon.build_playable_items() (shared art, InfoTagVideo
+setters, offscreen items and short lesson IDs). Runs outside Kodi with the stand-in modules
+in kodi_stubs/, so it measures the Python side of the work only.
+
+Usage (from the dev folder): python bench_listitems.py [--book Shabat] [--repeat 20]
+"""
+import os
+import sys
+import time
+import argparse
+import urllib.parse
+
+DEV_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DEV_DIR, "kodi_stubs"))
+sys.path.insert(0, os.path.dirname(DEV_DIR))
+# addon.py reads the plugin handle and URL from sys.argv at import, as Kodi passes them
+BENCH_ARGS = sys.argv[1:]
+sys.argv = ["plugin://plugin.video.guemara/", "1", ""]
+
+import xbmcgui
+import addon
+
+
+def legacy_create_listitem(title, plot="", is_playable=False, icon=None, thumb=None):
+    """create_listitem() as it was before build_playable_items() (one info/art dict per row)."""
+    li = xbmcgui.ListItem(label=title)
+    info = {'title': title, 'plot': plot, 'mediatype': 'video'}
+    if is_playable:
+        li.setProperty('IsPlayable', 'true')
+    li.setInfo('video', info)
+    icon_to_use = icon or ('DefaultMovies.png' if is_playable else 'DefaultFolder.png')
+    art = {'icon': icon_to_use}
+    if thumb:
+        art['thumb'] = thumb
+    elif icon_to_use != 'DefaultFolder.png' and icon_to_use != 'DefaultMovies.png':
+        art['thumb'] = icon_to_use
+    li.setArt(art)
+    return li
+
+
+def legacy_listing(seder, book, lessons):
+    items = []
+    for title, direct_url in lessons:
+        lesson_li = legacy_create_listitem(title, plot=f"Tratado de {book}, Seder {seder}", is_playable=True,
+                                           icon='DefaultMovies.png', thumb='DefaultMovies.png')
+        play_plugin_url = f"{addon.BASE_URL}?{urllib.parse.urlencode({'action': 'play', 'video_url': direct_url, 'title': title})}"
+        items.append((play_plugin_url, lesson_li, False))
+    return items
+
+
+def batched_listing(seder, book, lessons):
+    plot = f"Tratado de {book}, Seder {seder}"
+    return addon.build_playable_items(
+        ((addon.build_url({'action': 'play', 'id': addon.make_lesson_id(book, title)}), title, plot) for title, _ in lessons),
+        icon='DefaultMovies.png',
+        thumb='DefaultMovies.png'
+    )
+
+
+def bench(label, build, seder, book, lessons, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = build(seder, book, lessons)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    url_bytes = sum(len(url) for url, _, _ in items)
+    print(f"{label:<10} {best * 1000:8.2f} ms/listing  {best / len(items) * 1e6:7.2f} µs/item  "
+          f"{url_bytes / len(items):6.1f} bytes/URL")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--book", default="Shabat", help="masejta to list (default: Shabat)")
+    parser.add_argument("--repeat", type=int, default=20, help="repetitions, the best one is reported")
+    options = parser.parse_args(BENCH_ARGS)
+
+    seder = next((s for s, _, _ in addon.catalog_sedarim()
+                  if any(book == options.book for book, *_ in addon.catalog_books(s))), None)
+    if not seder:
+        print(f"❌ Masejta not found: {options.book}")
+        return 1
+    lessons = addon.catalog_lessons(seder, options.book)
+    print(f"{options.book} ({seder}): {len(lessons)} lessons, best of {options.repeat}")
+
+    before = bench("before", legacy_listing, seder, options.book, lessons, options.repeat)
+    after = bench("after", batched_listing, seder, options.book, lessons, options.repeat)
+    print(f"✅ speed-up: {before / after:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""Offline benchmark of the addon.py routes, run outside Kodi with the stand-ins in kodi_stubs/.
+
+Each invocation runs in a fresh interpreter, the way Kodi runs a plugin:// click, with the
+plugin handle, base URL and query string passed in sys.argv:
+
+  cold  first click after an install: empty addon profile (no catalog cache)
+  warm  any later click: profile cache already populated
+
+For every route it reports the time spent from compiling addon.py to the end of the route
+(interpreter start-up excluded), the peak Python memory allocated by the route once addon.py
+is compiled (tracemalloc, measured in a separate warm run so it does not slow down the timed
+ones) and the ListItems created.
+
+With --service the catalog files are published in the home window properties before each
+invocation, as service.py does once per Kodi session, so the routes read no catalog file.
+
+With --scales the catalog is also rebuilt with build_structure.py from synthetic lesson
+lists with N times more lessons per masejta, to see how each route scales.
+
+Usage (from the dev folder): python benchmark.py [--scales 1 10 100] [--sqlite] [--service] [--runs 3]
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+DEV_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(DEV_DIR)
+STUBS_DIR = os.path.join(DEV_DIR, "kodi_stubs")
+ADDON_ID = "plugin.video.guemara"
+
+SEARCH_QUERY = "kama 45"
+
+
+def run_child(options):
+    """Runs one plugin invocation in this process and prints its measurements as JSON."""
+    import time
+    import tracemalloc
+
+    sys.path.insert(0, STUBS_DIR)
+    import xbmcvfs
+    import xbmcgui
+    import xbmcplugin
+
+    xbmcvfs.SPECIAL_PATHS[f"special://home/addons/{ADDON_ID}"] = options.addon_dir
+    xbmcvfs.SPECIAL_PATHS["special://profile"] = options.profile_dir
+    if options.query:
+        xbmcgui.DIALOG_INPUTS.append(options.query)
+    if options.service:
+        publish_catalog(options.addon_dir)
+
+    sys.argv = [f"plugin://{ADDON_ID}/", "1", "?" + options.params]
+    addon_path = os.path.join(options.addon_dir, "addon.py")
+    start = time.perf_counter()
+    # Kodi compiles the entry script on every click: timed, but not part of the route's memory
+    with open(addon_path, "rb") as f:
+        code = compile(f.read(), addon_path, "exec")
+    if options.memory:
+        tracemalloc.start()
+    exec(code, {"__name__": "__main__", "__file__": addon_path})
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if options.memory else None
+
+    print(json.dumps({
+        "ms": elapsed * 1000,
+        "peak_kb": peak / 1024 if peak is not None else None,
+        "listitems": xbmcgui.LISTITEM_COUNT,
+        "calls": xbmcplugin.CALLS,
+    }))
+
+
+def publish_catalog(addon_dir):
+    """Publishes the catalog files in the stub home window, like service.py (without importing addon.py)."""
+    import xbmcgui
+    catalog_dir = os.path.join(addon_dir, "resources", "catalog")
+    window = xbmcgui.Window(10000)
+    for dirpath, _, filenames in os.walk(catalog_dir):
+        for filename in filenames:
+            if filename.endswith(".json"):
+                path = os.path.join(dirpath, filename)
+                with open(path, encoding="utf-8") as f:
+                    part = os.path.relpath(path, catalog_dir).replace(os.sep, "/")
+                    window.setProperty(f"plugin.video.guemara.catalog.{part}", f.read())
+    with open(os.path.join(catalog_dir, "version"), encoding="utf-8") as f:
+        window.setProperty("plugin.video.guemara.catalog.version", f.read().strip())
+
+
+def invoke(addon_dir, profile_dir, params, query=None, memory=False, service=False):
+    """Runs one invocation in a fresh interpreter and returns its measurements."""
+    command = [sys.executable, os.path.abspath(__file__), "--child",
+               "--addon-dir", addon_dir, "--profile-dir", profile_dir, "--params", params]
+    if query:
+        command += ["--query", query]
+    if memory:
+        command.append("--memory")
+    if service:
+        command.append("--service")
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def build_catalog(target_dir, scale, sqlite):
+    """Builds an addon tree in target_dir whose catalog has `scale` times more lessons per masejta."""
+    os.makedirs(target_dir, exist_ok=True)
+    shutil.copy(os.path.join(ADDON_DIR, "addon.py"), target_dir)
+    shutil.copy(os.path.join(DEV_DIR, "sedarim_thumb_urls.txt"), target_dir)
+
+    for folder in sorted(os.listdir(DEV_DIR)):
+        source = os.path.join(DEV_DIR, folder)
+        if not (folder.startswith("Seder_") and os.path.isdir(source)):
+            continue
+        os.makedirs(os.path.join(target_dir, folder), exist_ok=True)
+        for filename in os.listdir(source):
+            with open(os.path.join(source, filename), encoding="utf-8") as f:
+                urls = [line.strip() for line in f if line.strip()]
+            with open(os.path.join(target_dir, folder, filename), "w", encoding="utf-8") as f:
+                f.write("\n".join(urls * scale) + "\n")
+
+    command = [sys.executable, os.path.join(DEV_DIR, "build_structure.py")]
+    if sqlite:
+        command.append("--sqlite")
+    subprocess.run(command, cwd=target_dir, check=True, capture_output=True)
+    if sqlite and not os.path.isfile(os.path.join(target_dir, "resources", "catalog", "guemara.db")):
+        raise RuntimeError("build_structure.py did not produce the SQLite catalog")
+
+
+def catalog_routes(addon_dir):
+    """Returns [(name, params, dialog input)] for the benchmarked routes of a catalog."""
+    with open(os.path.join(addon_dir, "resources", "catalog", "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    seder, book, count = max(((s, b, data["lessons"]) for s, seder_data in manifest.items()
+                              for b, data in seder_data["books"].items()), key=lambda entry: entry[2])
+    largest_seder = max(manifest, key=lambda s: len(manifest[s]["books"]))
+    book_slug = book.replace(" ", "_")
+    return [
+        ("root", "", None),
+        (f"list_books {largest_seder}", f"action=list_books&seder={largest_seder}", None),
+        (f"list_lessons {book} ({count})", f"action=list_lessons&seder={seder}&book={book.replace(' ', '+')}", None),
+        (f"search '{SEARCH_QUERY}'", "action=search", SEARCH_QUERY),
+        (f"play {book_slug}.3", f"action=play&id={book_slug}.3", None),
+        ("widget daf_yomi_today", "action=daf_yomi_today", None),
+    ]
+
+
+def bench_catalog(addon_dir, runs, service=False):
+    results = []
+    for name, params, query in catalog_routes(addon_dir):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            cold = invoke(addon_dir, profile_dir, params, query, service=service)
+            warm = min((invoke(addon_dir, profile_dir, params, query, service=service) for _ in range(runs)),
+                       key=lambda r: r["ms"])
+            memory = invoke(addon_dir, profile_dir, params, query, memory=True, service=service)
+        results.append((name, cold["ms"], warm["ms"], memory["peak_kb"], warm["listitems"]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1],
+                        help="catalog scales to benchmark; 1 is the shipped catalog (default: 1)")
+    parser.add_argument("--sqlite", action="store_true", help="benchmark the SQLite catalog instead of the JSON files")
+    parser.add_argument("--service", action="store_true",
+                        help="serve the catalog from window properties, as when service.py is running")
+    parser.add_argument("--runs", type=int, default=3, help="warm runs per route, the best one is reported")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--addon-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--profile-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--params", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--query", help=argparse.SUPPRESS)
+    parser.add_argument("--memory", action="store_true", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.child:
+        run_child(options)
+        return 0
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in options.scales:
+            if scale == 1 and not options.sqlite:
+                addon_dir = ADDON_DIR
+            else:
+                addon_dir = os.path.join(work_dir, f"x{scale}")
+                print(f"Building {scale}x catalog...")
+                build_catalog(addon_dir, scale, options.sqlite)
+
+            print(f"\n=== {scale}x catalog ({'SQLite' if options.sqlite else 'JSON'}{', service' if options.service else ''}) ===")
+            print(f"{'route':<32} {'cold ms':>9} {'warm ms':>9} {'peak KB':>9} {'items':>7}")
+            for name, cold_ms, warm_ms, peak_kb, listitems in bench_catalog(addon_dir, options.runs, options.service):
+                print(f"{name:<32} {cold_ms:9.1f} {warm_ms:9.1f} {peak_kb:9.0f} {listitems:7d}")
+
+    print("\n✅ Benchmark finished.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
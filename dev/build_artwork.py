@@ -0,0 +1,173 @@
+"""Builds the addon artwork in resources/images from the full-size originals in dev/artwork/.
+
+  resources/images/sedarim/<seder>.jpg     Seder thumbs (2:3 poster, 500x750)
+  resources/images/books/<Book_Slug>.jpg   one thumb per masejta: its Seder artwork with the name
+  resources/images/icon.png, fanart.jpg    capped at 512x512 and 1920x1080
+
+Originals missing from dev/artwork/ are first downloaded from sedarim_thumb_urls.txt. Outputs
+newer than their original are kept unless --force is given. Run it before build_structure.py,
+which references the generated files (with the remote URL as fallback) in the catalog.
+
+Requires Pillow (pip install Pillow). Usage (from the dev folder): python build_artwork.py [--force]
+"""
+import os
+import sys
+import argparse
+import urllib.request
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+except ImportError:
+    print("❌ Pillow is required to build the artwork: pip install Pillow")
+    sys.exit(1)
+
+ARTWORK_DIR = "artwork" # Full-size originals, <seder>.png
+IMAGES_DIR = os.path.join("..", "resources", "images")
+THUMB_URL_FILE = "sedarim_thumb_urls.txt"
+
+THUMB_SIZE = (500, 750)
+BOOK_THUMB_SIZE = (400, 600)
+ICON_SIZE = (512, 512)
+FANART_SIZE = (1920, 1080)
+JPEG_QUALITY = 85
+FONT_FILES = ["DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "arialbd.ttf"]
+
+
+def is_up_to_date(output_path, source_path, force):
+    return (not force and os.path.isfile(output_path)
+            and os.path.getmtime(output_path) >= os.path.getmtime(source_path))
+
+
+def open_rgb(path):
+    """Opens an image flattened onto black, ready to be saved as JPEG."""
+    image = Image.open(path)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (0, 0, 0))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def save_jpeg(image, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    image.save(tmp_path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def load_font(size):
+    for font_file in FONT_FILES:
+        try:
+            return ImageFont.truetype(font_file, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def download_originals():
+    """Downloads the Seder images listed in sedarim_thumb_urls.txt that are not in dev/artwork/ yet."""
+    try:
+        with open(THUMB_URL_FILE, encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip()]
+    except OSError as e:
+        print(f"⚠️ Could not read '{THUMB_URL_FILE}': {e}")
+        return
+
+    os.makedirs(ARTWORK_DIR, exist_ok=True)
+    for url in urls:
+        original_path = os.path.join(ARTWORK_DIR, os.path.basename(url.split("?")[0]))
+        if os.path.isfile(original_path):
+            continue
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                data = response.read()
+            with open(original_path, "wb") as f:
+                f.write(data)
+            print(f"✅ Downloaded '{url}'.")
+        except OSError as e:
+            print(f"⚠️ Could not download '{url}': {e}")
+
+
+def list_sedarim():
+    """Returns [(seder, [masejta, ...])] from the Seder_*/ lesson list folders."""
+    sedarim = []
+    for folder in sorted(os.listdir(".")):
+        if folder.startswith("Seder_") and os.path.isdir(folder):
+            books = [name[:-4].replace("_", " ") for name in sorted(os.listdir(folder)) if name.endswith(".txt")]
+            sedarim.append((folder[len("Seder_"):], books))
+    return sedarim
+
+
+def build_book_thumb(seder_image, book):
+    """Crops the Seder artwork to the book thumb size and writes the masejta name on a dark band."""
+    thumb = ImageOps.fit(seder_image, BOOK_THUMB_SIZE, Image.LANCZOS)
+    width, height = thumb.size
+    band_top = int(height * 0.70)
+
+    overlay = Image.new("RGBA", thumb.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    draw.rectangle([(0, band_top), (width, height)], fill=(0, 0, 0, 170))
+    thumb = Image.alpha_composite(thumb.convert("RGBA"), overlay)
+
+    draw = ImageDraw.Draw(thumb)
+    font_size = 64
+    font = load_font(font_size)
+    while draw.textlength(book, font=font) > width * 0.9 and font_size > 20:
+        font_size -= 4
+        font = load_font(font_size)
+    draw.text((width / 2, (band_top + height) / 2), book, font=font, fill=(255, 255, 255), anchor="mm")
+    return thumb.convert("RGB")
+
+
+def fit_in_place(path, max_size):
+    """Scales an existing image down to max_size, if it is larger."""
+    if not os.path.isfile(path):
+        print(f"⚠️ '{path}' not found.")
+        return
+    with Image.open(path) as image:
+        if image.width <= max_size[0] and image.height <= max_size[1]:
+            return
+        image.load()
+    image.thumbnail(max_size, Image.LANCZOS)
+    image.save(path, optimize=True)
+    print(f"✅ '{path}' scaled down to {image.width}x{image.height}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds the addon artwork from the originals in dev/artwork/.")
+    parser.add_argument("--force", action="store_true", help="rebuild every image, even if up to date")
+    options = parser.parse_args()
+
+    download_originals()
+
+    written = 0
+    for seder, books in list_sedarim():
+        original_path = os.path.join(ARTWORK_DIR, f"{seder.lower()}.png")
+        if not os.path.isfile(original_path):
+            print(f"⚠️ No artwork for Seder {seder} ('{original_path}'), skipping its thumbs.")
+            continue
+
+        thumb_path = os.path.join(IMAGES_DIR, "sedarim", f"{seder.lower()}.jpg")
+        book_paths = [(book, os.path.join(IMAGES_DIR, "books", f"{book.replace(' ', '_')}.jpg")) for book in books]
+        pending = [(None, thumb_path)] + book_paths
+        pending = [(book, path) for book, path in pending if not is_up_to_date(path, original_path, options.force)]
+        if not pending:
+            continue
+
+        seder_image = open_rgb(original_path)
+        for book, path in pending:
+            if book is None:
+                save_jpeg(ImageOps.fit(seder_image, THUMB_SIZE, Image.LANCZOS), path)
+            else:
+                save_jpeg(build_book_thumb(seder_image, book), path)
+            written += 1
+        print(f"✅ Seder {seder}: {len(pending)} thumbs written.")
+
+    fit_in_place(os.path.join(IMAGES_DIR, "icon.png"), ICON_SIZE)
+    fit_in_place(os.path.join(IMAGES_DIR, "fanart.jpg"), FANART_SIZE)
+    print(f"✅ Artwork up to date ({written} images written).")
+
+
+if __name__ == "__main__":
+    main()
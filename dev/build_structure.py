@@ -1,5 +1,21 @@
 import os
+import re
 import json
+import hashlib
+import sqlite3
+import argparse
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Command line options ---
+parser = argparse.ArgumentParser(description="Builds the addon catalog from the Seder_*/*.txt lesson lists.")
+parser.add_argument("--sqlite", action="store_true",
+                    help="also write resources/catalog/guemara.db (SQLite catalog)")
+parser.add_argument("--full", action="store_true",
+                    help="reprocess every lesson list, ignoring the incremental build cache")
+parser.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1),
+                    help="number of lesson lists processed concurrently")
+args = parser.parse_args()
 
 # Category descriptions (Sedarim)
 CATEGORY_DESCRIPTIONS = {
@@ -82,6 +98,66 @@ MASECHTOT_ORDER = {
     "Taharot": ["Nida"]
 }
 
+# --- Daf Yomi cycle ---
+# The cycle studies the masechtot in the order above, except that Shekalim follows Pesajim
+# and Makot and Shevuot follow Sanhedrin. Each cycle is one daf per day, 2711 days, and
+# cycle 14 started on 5 January 2020 with Berajot 2.
+DAF_YOMI_MOVES = [("Shekalim", "Pesajim"), ("Makot", "Sanhedrin"), ("Shevuot", "Makot")] # (masejta, placed after)
+DAF_YOMI_START = "2020-01-05"
+DAF_YOMI_DAYS = 2711
+
+# --- Alternative spellings of each masejta, indexed for search ---
+# Ashkenazi/Sephardi/English transliterations users commonly type instead of ours
+BOOK_ALIASES = {
+    "Berajot": ["Berachot", "Berakhot", "Brachot", "Berachos"],
+    "Shabat": ["Shabbat", "Shabbos", "Sabbat"],
+    "Eruvin": ["Eiruvin", "Erubin"],
+    "Pesajim": ["Pesachim", "Pesahim", "Pesachin"],
+    "Yoma": ["Ioma"],
+    "Suca": ["Sukkah", "Sukka", "Succah", "Suka"],
+    "Beitza": ["Beitzah", "Betzah", "Beiza", "Beitsa"],
+    "Rosh Hashana": ["Rosh Hashanah", "Rosh Hashaná"],
+    "Taanit": ["Taanis", "Ta'anit", "Taanith"],
+    "Shekalim": ["Shkalim", "Sheqalim"],
+    "Meguila": ["Megillah", "Megila", "Meguilah"],
+    "Moed Katan": ["Mo'ed Katan", "Moed Qatan"],
+    "Jaguiga": ["Chagigah", "Hagigah", "Chagiga", "Jaguigá"],
+    "Yevamot": ["Yevamos", "Yebamot", "Iebamot"],
+    "Ketubot": ["Ketubbot", "Kesubos", "Ketuvot", "Ketubos"],
+    "Nedarim": ["Nedorim"],
+    "Nazir": ["Nozir"],
+    "Sota": ["Sotah"],
+    "Guitin": ["Gittin", "Gitin"],
+    "Kidushin": ["Kiddushin", "Kidushim"],
+    "Baba Kama": ["Bava Kamma", "Bava Kama", "Baba Kamma"],
+    "Baba Metzia": ["Bava Metzia", "Bava Metziah", "Baba Mezia", "Baba Metsia"],
+    "Baba Batra": ["Bava Batra", "Bava Basra", "Baba Basra"],
+    "Sanhedrin": ["Sanedrin"],
+    "Avoda Zara": ["Avodah Zarah", "Avoda Zarah", "Avodah Zara"],
+    "Horayot": ["Horayos", "Horaiot"],
+    "Shevuot": ["Shevuos", "Shebuot", "Shvuot"],
+    "Makot": ["Makkot", "Makos", "Makkos"],
+    "Zebajim": ["Zevachim", "Zevahim", "Zebachim"],
+    "Menajot": ["Menachot", "Menahot", "Menachos"],
+    "Julin": ["Chullin", "Hullin", "Jullin", "Chulin"],
+    "Bejorot": ["Bechorot", "Bekhorot", "Bechoros"],
+    "Arajin": ["Arachin", "Arakhin"],
+    "Temura": ["Temurah"],
+    "Keritot": ["Kritot", "Kerisos", "Kerithot"],
+    "Meila": ["Meilah", "Me'ilah", "Meilá"],
+    "Nida": ["Niddah", "Nidah", "Nidda"],
+}
+
+
+def normalize_text(text):
+    """Lowercases, folds accents and splits on anything that is not a letter or digit.
+
+    Must stay in sync with normalize_text() in addon.py, which normalizes the queries.
+    """
+    folded = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).lower()
+    return re.findall(r"[a-z0-9]+", folded)
+
 # --- Read Seder Thumb URLs from external file ---
 THUMB_URL_FILE = "sedarim_thumb_urls.txt"
 seder_thumb_urls = []
@@ -104,8 +180,137 @@ except Exception as e:
     seder_thumb_urls = []
 
 
+# --- Local artwork (generated by build_artwork.py) ---
+# Images are referenced relative to the addon folder, and only when they exist. The Seder
+# thumbs keep their remote URL as "thumb_url", used by the addon if the local file is missing.
+ADDON_DIR = ".."
+
+
+def local_artwork(relative_path):
+    """Returns relative_path if that image exists in the addon folder, else None."""
+    return relative_path if os.path.isfile(os.path.join(ADDON_DIR, *relative_path.split("/"))) else None
+
+
+# --- Compact lesson records ---
+# The JSON catalog does not store lesson titles or full URLs. Titles are "<masejta> <daf>"
+# with consecutive dafim from the book's "first_daf", and each URL is stored as a record
+# [video id, signature, profile] plus, when the book mixes URL layouts, the index of its
+# layout in the book's "url_templates". URLs that fit no layout are stored as they are.
+URL_LAYOUTS = [
+    (re.compile(r"https://player\.vimeo\.com/external/(?P<id>\d+)\.sd\.mp4\?s=(?P<sig>[0-9a-f]+)&profile_id=(?P<profile>\d+)&oauth2_token_id=1135058799$"),
+     "https://player.vimeo.com/external/{0}.sd.mp4?s={1}&profile_id={2}&oauth2_token_id=1135058799"),
+    (re.compile(r"https://player\.vimeo\.com/external/(?P<id>\d+)\.hd\.mp4\?s=(?P<sig>[0-9a-f]+)&profile_id=(?P<profile>\d+)&oauth2_token_id=1135058799$"),
+     "https://player.vimeo.com/external/{0}.hd.mp4?s={1}&profile_id={2}&oauth2_token_id=1135058799"),
+    (re.compile(r"https://player\.vimeo\.com/external/(?P<id>\d+)\.sd\.mp4\?s=(?P<sig>[0-9a-f]+)&profile_id=(?P<profile>\d+)$"),
+     "https://player.vimeo.com/external/{0}.sd.mp4?s={1}&profile_id={2}"),
+    (re.compile(r"https://player\.vimeo\.com/progressive_redirect/playback/(?P<id>\d+)/rendition/(?P<profile>\w+)\?loc=external&signature=(?P<sig>[0-9a-f]+)$"),
+     "https://player.vimeo.com/progressive_redirect/playback/{0}/rendition/{2}?loc=external&signature={1}"),
+]
+
+
+def compact_lessons(masejta_name, lessons):
+    """Returns the compact fields of a book ({"first_daf", "url_templates", "lessons"}) from {title: url}."""
+    titles = list(lessons)
+    first_daf = int(titles[0].rsplit(" ", 1)[1]) if titles else 2
+    if titles != [f"{masejta_name} {daf}" for daf in range(first_daf, first_daf + len(titles))]:
+        raise ValueError(f"Lesson titles of {masejta_name} are not consecutive dafim")
+
+    templates, records = [], []
+    for url in lessons.values():
+        record = url
+        for pattern, template in URL_LAYOUTS:
+            match = pattern.match(url)
+            if not match:
+                continue
+            profile = match["profile"]
+            candidate = [int(match["id"]), match["sig"], int(profile) if profile.isdigit() else profile]
+            if template.format(*candidate) == url: # Only when the URL is rebuilt exactly
+                if template not in templates:
+                    templates.append(template)
+                layout = templates.index(template)
+                record = candidate + [layout] if layout else candidate
+            break
+        records.append(record)
+    return {"first_daf": first_daf, "url_templates": templates, "lessons": records}
+
+
+def compact_book(masejta_name, book_data):
+    """Returns a book entry of the structure with its lessons in compact form."""
+    entry = {key: value for key, value in book_data.items() if key != "lessons"}
+    entry.update(compact_lessons(masejta_name, book_data["lessons"]))
+    return entry
+
+
+# --- Incremental build helpers ---
+# The build cache records, per lesson list, its size/mtime/SHA-1 and the lessons read from
+# it, so a rebuild only reprocesses the masechtot whose .txt actually changed.
+BUILD_CACHE_FILE = ".build_cache.json"
+BUILD_FORMAT = 2 # Bump when the layout of the generated files changes, to rewrite all of them
+
+
+def to_json(data):
+    """Serializes catalog data in compact form."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def write_atomic(path, content):
+    """Writes text through a temp file + rename, so the addon never reads a half-written file.
+
+    Returns False (leaving the file untouched) when its content is already up to date.
+    """
+    data = content.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def read_lesson_list(file_path, masejta_name, cached):
+    """Returns (cache entry, changed) for one masejta's .txt, reusing cached lessons when unchanged."""
+    st = os.stat(file_path)
+    if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+        return cached, False
+
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha1(raw).hexdigest()
+    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": digest}
+    if cached and cached["sha1"] == digest:
+        # Touched but identical (e.g. after a git checkout): only the stamp changes
+        return {**cached, **entry}, False
+
+    lines = [line.strip() for line in raw.decode("utf-8").splitlines() if line.strip()]
+    lessons = {}
+    for i, url in enumerate(lines, start=2):
+        lesson_title = f"{masejta_name} {i}"
+        lessons[lesson_title] = url # Store as simple URL for now
+    entry["lessons"] = lessons
+    return entry, True
+
+
+build_cache = {}
+if not args.full:
+    try:
+        with open(BUILD_CACHE_FILE, encoding="utf-8") as f:
+            cache_data = json.load(f)
+        if cache_data.get("format") == BUILD_FORMAT:
+            build_cache = cache_data["files"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    if not build_cache:
+        print(f"ℹ️ No usable build cache ('{BUILD_CACHE_FILE}'), processing every lesson list.")
+
+
 # --- Build structure in correct order ---
 output_structure = {}
+lesson_lists = [] # (seder_key, masejta_name, file_path) in canonical order
 
 # Iterate through Sedarim in the specified order, getting index too
 for index, (folder, seder_key) in enumerate(SEDER_FOLDER_MAP.items()):
@@ -125,10 +330,11 @@ for index, (folder, seder_key) in enumerate(SEDER_FOLDER_MAP.items()):
         # This warning is now handled during file reading, but keep check just in case
         print(f"  ⚠️ No thumb URL found or assigned for Seder {seder_key} at index {index}.")
 
-    # Initialize the structure for this Seder, adding the thumb key
+    # Initialize the structure for this Seder, adding the thumb keys (local image first, remote URL as fallback)
     output_structure[seder_key] = {
         "description": seder_description,
-        "thumb": current_seder_thumb_url, # Assign the URL (or None if not found)
+        "thumb": local_artwork(f"resources/images/sedarim/{seder_key.lower()}.jpg") or current_seder_thumb_url,
+        "thumb_url": current_seder_thumb_url, # Assign the URL (or None if not found)
         "books": {}
     }
 
@@ -143,39 +349,40 @@ for index, (folder, seder_key) in enumerate(SEDER_FOLDER_MAP.items()):
         filename = masejta_name.replace(" ", "_") + ".txt"
         file_path = os.path.join(folder, filename)
 
-        if not os.path.isfile(file_path):
-            # print(f"  ℹ️ Skipping Masechet '{masejta_name}' (file not found: {filename})") # Reduced verbosity
-            continue
+        if os.path.isfile(file_path):
+            lesson_lists.append((seder_key, masejta_name, file_path))
 
-        # print(f"  Processing Masechet: {masejta_name} (from file {filename})") # Reduced verbosity
+# Read the lesson lists concurrently, reusing the cached lessons of unchanged files
+new_build_cache = {}
+changed_masechtot = set()
+with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+    futures = [
+        executor.submit(read_lesson_list, file_path, masejta_name, build_cache.get(file_path))
+        for _, masejta_name, file_path in lesson_lists
+    ]
+    for (seder_key, masejta_name, file_path), future in zip(lesson_lists, futures):
         try:
-            with open(file_path, encoding='utf-8') as f:
-                lines = [line.strip() for line in f if line.strip()]
+            entry, changed = future.result()
+        except Exception as e:
+            print(f"  ❌ Error processing file {file_path}: {e}")
+            continue
 
-            if not lines:
-                # print(f"  ⚠️ File is empty: {filename}") # Reduced verbosity
-                continue
+        new_build_cache[file_path] = entry
+        if changed:
+            changed_masechtot.add(masejta_name)
+        if not entry["lessons"]:
+            continue # Empty file
 
-            lessons = {}
-            for i, url in enumerate(lines, start=2):
-                lesson_title = f"{masejta_name} {i}"
-                lessons[lesson_title] = url # Store as simple URL for now
+        # Add the book data, with its thumb when build_artwork.py generated one
+        book_entry = {"description": BOOK_DESCRIPTIONS.get(masejta_name, "")}
+        book_thumb = local_artwork(f"resources/images/books/{masejta_name.replace(' ', '_')}.jpg")
+        if book_thumb:
+            book_entry["thumb"] = book_thumb
+        book_entry["lessons"] = entry["lessons"]
+        output_structure[seder_key]["books"][masejta_name] = book_entry
 
-                # If you wanted lessons to have thumbs/more data from JSON later:
-                # lessons[lesson_title] = {"video": url, "thumb": None} # Example
-
-            book_description = BOOK_DESCRIPTIONS.get(masejta_name, "")
-            # if not book_description:
-            #      print(f"  ⚠️ No description found for Masechet: {masejta_name}") # Reduced verbosity
-
-            # Add the book data - NOTE: Currently NOT adding thumbs at book level
-            output_structure[seder_key]["books"][masejta_name] = {
-                "description": book_description,
-                # "thumb": "path/to/book/thumb.png", # Add logic here later if needed
-                "lessons": lessons
-            }
-        except Exception as e:
-            print(f"  ❌ Error processing file {filename}: {e}")
+print(f"ℹ️ {len(changed_masechtot)} of {len(lesson_lists)} lesson lists changed since the last build.")
+failed_outputs = [] # Outputs that could not be written, see the build cache below
 
 
 # --- Save the final structure as JSON ---
@@ -185,9 +392,232 @@ try:
     os.makedirs("resources", exist_ok=True)
     output_path = os.path.join("resources", "guemara_structure.json")
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_structure, f, indent=2, ensure_ascii=False)
+    compact_structure = {
+        seder_key: {**{key: value for key, value in seder_data.items() if key != "books"},
+                    "books": {masejta_name: compact_book(masejta_name, book_data)
+                              for masejta_name, book_data in seder_data["books"].items()}}
+        for seder_key, seder_data in output_structure.items()
+    }
+    write_atomic(output_path, to_json(compact_structure))
     print(f"✅ '{output_path}' generated successfully.")
 
 except Exception as e:
-    print(f"❌ Error writing JSON file '{output_path}': {e}")
\ No newline at end of file
+    print(f"❌ Error writing JSON file '{output_path}': {e}")
+    failed_outputs.append("structure JSON")
+
+# --- Save the sharded layout: compact manifest + one shard per masejta ---
+# addon.py reads the manifest for the root and Seder views and opens only the shard of
+# the masejta being listed, falling back to guemara_structure.json when these are absent.
+try:
+    catalog_dir = os.path.join("resources", "catalog")
+    shards_dir = os.path.join(catalog_dir, "shards")
+    os.makedirs(shards_dir, exist_ok=True)
+
+    manifest = {}
+    for seder_key, seder_data in output_structure.items():
+        manifest[seder_key] = {
+            "description": seder_data["description"],
+            "thumb": seder_data["thumb"],
+            "thumb_url": seder_data["thumb_url"],
+            "books": {}
+        }
+        for masejta_name, book_data in seder_data["books"].items():
+            shard_name = masejta_name.replace(" ", "_") + ".json"
+            shard_path = os.path.join(shards_dir, shard_name)
+            # Only the shards of changed masechtot are rewritten
+            if masejta_name in changed_masechtot or not os.path.isfile(shard_path):
+                shard = {"seder": seder_key, "book": masejta_name, **compact_lessons(masejta_name, book_data["lessons"])}
+                write_atomic(shard_path, to_json(shard))
+            with open(shard_path, "rb") as f:
+                shard_hash = hashlib.sha1(f.read()).hexdigest()[:12]
+
+            manifest[seder_key]["books"][masejta_name] = {
+                "description": book_data["description"],
+                "lessons": len(book_data["lessons"]),
+                "shard": f"shards/{shard_name}",
+                # Lets update_catalog() in resources/lib/catalog_updates.py download only the shards that changed
+                "hash": shard_hash
+            }
+            if "thumb" in book_data:
+                manifest[seder_key]["books"][masejta_name]["thumb"] = book_data["thumb"]
+
+    manifest_path = os.path.join(catalog_dir, "manifest.json")
+    write_atomic(manifest_path, to_json(manifest))
+
+    # Shards of masechtot that left the catalog (service.py publishes every file in the folder)
+    manifest_shards = {os.path.basename(book["shard"]) for seder_data in manifest.values() for book in seder_data["books"].values()}
+    for file_name in os.listdir(shards_dir):
+        if file_name.endswith(".json") and file_name not in manifest_shards:
+            os.remove(os.path.join(shards_dir, file_name))
+            print(f"ℹ️ Removed stale shard '{file_name}'.")
+
+    # Content hash of the whole catalog: addon.py stamps its folder URLs with it, so Kodi's
+    # directory cache is invalidated exactly when a different catalog ships
+    catalog_version = hashlib.sha1(
+        json.dumps(output_structure, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:12]
+    write_atomic(os.path.join(catalog_dir, "version"), catalog_version)
+    print(f"✅ '{manifest_path}' and {sum(len(m['books']) for m in manifest.values())} shards generated successfully.")
+
+except Exception as e:
+    print(f"❌ Error writing sharded catalog: {e}")
+    failed_outputs.append("sharded catalog")
+
+
+# --- Save the search index ---
+# Lets search_dialog() in addon.py resolve queries such as "kama 45" through token and
+# daf lookups instead of scanning every lesson title.
+try:
+    search_books = []
+    search_tokens = {}
+    for seder_key, seder_data in output_structure.items():
+        for masejta_name, book_data in seder_data["books"].items():
+            book_idx = len(search_books)
+            # Titles are "<masejta> <daf>", keep the daf numbers for exact lookups
+            dafs = [int(title.rsplit(" ", 1)[1]) for title in book_data["lessons"]]
+            search_books.append({"seder": seder_key, "book": masejta_name, "dafs": dafs})
+
+            for name in [masejta_name] + BOOK_ALIASES.get(masejta_name, []):
+                for token in normalize_text(name):
+                    book_list = search_tokens.setdefault(token, [])
+                    if book_idx not in book_list:
+                        book_list.append(book_idx)
+
+    search_index_path = os.path.join("resources", "catalog", "search_index.json")
+    write_atomic(search_index_path, to_json({"books": search_books, "tokens": search_tokens}))
+    print(f"✅ '{search_index_path}' generated successfully ({len(search_tokens)} tokens).")
+
+except Exception as e:
+    print(f"❌ Error writing search index: {e}")
+    failed_outputs.append("search index")
+
+
+# --- Save the Daf Yomi table ---
+# Lets the Daf Yomi widgets in addon.py find the daf of a date with a tiny file read: one
+# row [first day, seder, masejta, first daf, thumb] per masejta, in cycle order.
+try:
+    daf_yomi_order = [masejta for masechtot in MASECHTOT_ORDER.values() for masejta in masechtot]
+    for masejta, after in DAF_YOMI_MOVES:
+        daf_yomi_order.remove(masejta)
+        daf_yomi_order.insert(daf_yomi_order.index(after) + 1, masejta)
+    catalog_books = {masejta_name: (seder_key, book_data)
+                     for seder_key, seder_data in output_structure.items()
+                     for masejta_name, book_data in seder_data["books"].items()}
+
+    daf_yomi_rows = []
+    day = 0
+    for masejta_name in daf_yomi_order:
+        if masejta_name not in catalog_books:
+            continue
+        seder_key, book_data = catalog_books[masejta_name]
+        first_daf = min(int(title.rsplit(" ", 1)[1]) for title in book_data["lessons"])
+        daf_yomi_rows.append([day, seder_key, masejta_name, first_daf, book_data.get("thumb")])
+        day += len(book_data["lessons"])
+
+    daf_yomi_path = os.path.join("resources", "catalog", "daf_yomi.json")
+    if day != DAF_YOMI_DAYS:
+        # A masejta is missing or incomplete: every later date would point at the wrong daf
+        print(f"⚠️ The catalog covers {day} dafim instead of the {DAF_YOMI_DAYS} of the Daf Yomi cycle, '{daf_yomi_path}' not written.")
+        if os.path.isfile(daf_yomi_path):
+            # The one of an earlier build no longer matches this catalog: the widgets show nothing instead
+            os.remove(daf_yomi_path)
+            print(f"ℹ️ Removed the previous '{daf_yomi_path}'.")
+    else:
+        write_atomic(daf_yomi_path, to_json({"start": DAF_YOMI_START, "days": day, "masechtot": daf_yomi_rows}))
+        print(f"✅ '{daf_yomi_path}' generated successfully.")
+
+except Exception as e:
+    print(f"❌ Error writing Daf Yomi table: {e}")
+    failed_outputs.append("Daf Yomi table")
+
+
+# --- Optionally save the SQLite catalog ---
+# addon.py prefers this database when it is shipped in resources/catalog/: every route then
+# runs a single indexed query instead of loading JSON files (search still ranks with the
+# search index, so that both catalogs give the same results).
+SQLITE_SCHEMA = """
+CREATE TABLE sedarim (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT NOT NULL,
+    thumb TEXT,
+    thumb_url TEXT,
+    position INTEGER NOT NULL
+);
+CREATE TABLE books (
+    id INTEGER PRIMARY KEY,
+    seder_id INTEGER NOT NULL REFERENCES sedarim(id),
+    name TEXT NOT NULL UNIQUE,
+    description TEXT NOT NULL,
+    lesson_count INTEGER NOT NULL,
+    thumb TEXT,
+    position INTEGER NOT NULL
+);
+CREATE TABLE lessons (
+    id INTEGER PRIMARY KEY,
+    book_id INTEGER NOT NULL REFERENCES books(id),
+    position INTEGER NOT NULL,
+    daf INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX books_seder ON books(seder_id, position);
+CREATE INDEX lessons_book ON lessons(book_id, position);
+CREATE UNIQUE INDEX lessons_book_daf ON lessons(book_id, daf);
+"""
+
+if args.sqlite:
+    db_path = os.path.join("resources", "catalog", "guemara.db")
+    tmp_db_path = f"{db_path}.tmp"
+    try:
+        # Built next to the final file and renamed when complete
+        if os.path.exists(tmp_db_path):
+            os.remove(tmp_db_path)
+        conn = sqlite3.connect(tmp_db_path)
+        conn.executescript(SQLITE_SCHEMA)
+
+        for seder_pos, (seder_key, seder_data) in enumerate(output_structure.items()):
+            seder_id = conn.execute(
+                "INSERT INTO sedarim (name, description, thumb, thumb_url, position) VALUES (?, ?, ?, ?, ?)",
+                (seder_key, seder_data["description"], seder_data["thumb"], seder_data["thumb_url"], seder_pos)
+            ).lastrowid
+            for book_pos, (masejta_name, book_data) in enumerate(seder_data["books"].items()):
+                book_id = conn.execute(
+                    "INSERT INTO books (seder_id, name, description, lesson_count, thumb, position) VALUES (?, ?, ?, ?, ?, ?)",
+                    (seder_id, masejta_name, book_data["description"], len(book_data["lessons"]), book_data.get("thumb"), book_pos)
+                ).lastrowid
+                for lesson_pos, (lesson_title, url) in enumerate(book_data["lessons"].items()):
+                    daf = int(lesson_title.rsplit(" ", 1)[1])
+                    conn.execute(
+                        "INSERT INTO lessons (book_id, position, daf, title, url) VALUES (?, ?, ?, ?, ?)",
+                        (book_id, lesson_pos, daf, lesson_title, url)
+                    )
+
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        os.replace(tmp_db_path, db_path)
+        print(f"✅ '{db_path}' generated successfully.")
+
+    except Exception as e:
+        print(f"❌ Error writing SQLite catalog '{db_path}': {e}")
+        failed_outputs.append("SQLite catalog")
+else:
+    # addon.py would keep preferring the database of an earlier --sqlite build over the new JSON files
+    db_path = os.path.join("resources", "catalog", "guemara.db")
+    if os.path.isfile(db_path):
+        os.remove(db_path)
+        print(f"ℹ️ Removed the SQLite catalog '{db_path}' of an earlier build (use --sqlite to keep one).")
+
+
+# --- Save the build cache for the next incremental build ---
+# Only when every output was written: otherwise the next build would take the lesson lists
+# changed in this one for unchanged, and never rewrite their shards
+if failed_outputs:
+    print(f"⚠️ Build cache '{BUILD_CACHE_FILE}' not updated ({', '.join(failed_outputs)} failed), "
+          "the next build processes these changes again.")
+else:
+    try:
+        write_atomic(BUILD_CACHE_FILE, to_json({"format": BUILD_FORMAT, "files": new_build_cache}))
+    except Exception as e:
+        print(f"⚠️ Could not write build cache '{BUILD_CACHE_FILE}': {e}")
@@ -0,0 +1,370 @@
+"""Concurrent link-health checker for the lesson catalog built by build_structure.py.
+
+Every lesson URL is probed with a HEAD request (falling back to a one-byte ranged GET when
+the server refuses HEAD), following redirects, from a bounded pool of worker threads. Each
+worker keeps one keep-alive connection per host, so a full-Shas sweep mostly reuses a
+handful of TLS connections instead of opening ~2,700 of them. Connection errors, timeouts,
+429 and 5xx responses are retried with exponential backoff.
+
+Outputs (in --output-dir):
+  link_report.json      summary plus one record per lesson (status, final URL, error, time)
+  flagged_lessons.json  only the failing lessons, grouped as {seder: {book: {lesson: record}}}
+  refreshed_structure.json  the checked catalog with the URLs of permanently moved lessons
+                        replaced, only written when there are some: a 301/308 redirect
+                        is followed there, a 302/307 (often a signed or short-lived URL) is not
+
+With --self-test the checker runs against a local stub HTTP server instead of the catalog
+and verifies the classification (ok / redirect / moved / no-HEAD / flaky / broken), the
+refreshed catalog and connection reuse.
+
+Usage (from the dev folder): python check_links.py [--workers 16] [--book "Baba Kama"] [--limit 50]
+                             python check_links.py --self-test
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DEFAULT_STRUCTURE = os.path.join("resources", "guemara_structure.json")
+MAX_REDIRECTS = 5
+PERMANENT_REDIRECTS = {301, 308}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+NO_HEAD_STATUSES = {403, 405, 501} # Some CDNs sign URLs per method or reject HEAD outright
+USER_AGENT = "plugin.video.guemara link checker"
+
+
+class ConnectionPool:
+    """Keeps one keep-alive connection per (scheme, host) for each worker thread."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _connections(self):
+        if not hasattr(self._local, "connections"):
+            self._local.connections = {}
+        return self._local.connections
+
+    def get(self, scheme, netloc):
+        connections = self._connections()
+        conn = connections.get((scheme, netloc))
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(netloc, timeout=self.timeout)
+            connections[(scheme, netloc)] = conn
+            with self._lock:
+                self.opened += 1
+        return conn
+
+    def drop(self, scheme, netloc):
+        conn = self._connections().pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+
+def send(pool, method, url):
+    """Sends one request on the pooled connection and returns (status, location)."""
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    headers = {"User-Agent": USER_AGENT}
+    if method == "GET":
+        headers["Range"] = "bytes=0-0"
+
+    conn = pool.get(parts.scheme, parts.netloc)
+    try:
+        conn.request(method, path, headers=headers)
+        response = conn.getresponse()
+        if method == "GET" and response.status == 200:
+            # Range ignored: the body is the whole video, so give up the connection instead
+            pool.drop(parts.scheme, parts.netloc)
+        else:
+            response.read()
+            if response.will_close:
+                pool.drop(parts.scheme, parts.netloc)
+    except (OSError, http.client.HTTPException):
+        pool.drop(parts.scheme, parts.netloc)
+        raise
+    return response.status, response.getheader("Location")
+
+
+def probe(pool, url):
+    """Follows redirects from url and returns (final status, final URL, permanent URL).
+
+    The permanent URL is where the permanent redirects at the start of the chain lead, the
+    address the catalog can be updated to; it is url itself when the first one is temporary.
+    """
+    permanent_url = url
+    for _ in range(MAX_REDIRECTS + 1):
+        status, location = send(pool, "HEAD", url)
+        if status in NO_HEAD_STATUSES:
+            status, location = send(pool, "GET", url)
+        if status in (301, 302, 303, 307, 308) and location:
+            moved = permanent_url == url and status in PERMANENT_REDIRECTS
+            url = urllib.parse.urljoin(url, location)
+            if moved:
+                permanent_url = url
+            continue
+        return status, url, permanent_url
+    raise http.client.HTTPException(f"more than {MAX_REDIRECTS} redirects")
+
+
+def check_url(pool, url, retries, backoff):
+    """Probes url, retrying transient failures, and returns its result record."""
+    start = time.perf_counter()
+    status, final_url, permanent_url, error = None, None, None, None
+    for attempt in range(retries + 1):
+        try:
+            status, final_url, permanent_url = probe(pool, url)
+        except (OSError, http.client.HTTPException) as e:
+            status, error = None, str(e) or type(e).__name__
+        else:
+            error = None if 200 <= status < 300 else f"HTTP {status}"
+            if status not in RETRY_STATUSES:
+                break
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+    ok = status is not None and 200 <= status < 300
+    return {
+        "status": status,
+        "ok": ok,
+        "final_url": final_url if final_url != url else None,
+        "moved_to": permanent_url if ok and permanent_url != url else None,
+        "error": error,
+        "attempts": attempt + 1,
+        "ms": round((time.perf_counter() - start) * 1000),
+    }
+
+
+def iter_lessons(structure, book_filter=None):
+    """Yields (seder, book, lesson title, url) for every lesson in a guemara_structure.json."""
+    for seder, seder_data in structure.items():
+        for book, book_data in seder_data.get("books", {}).items():
+            if book_filter and book != book_filter:
+                continue
+            lessons = book_data.get("lessons", {})
+            if isinstance(lessons, dict): # Catalogs older than the compact lesson records
+                for lesson, url in lessons.items():
+                    yield seder, book, lesson, url
+                continue
+            # Compact records, see build_structure.py: [video id, signature, profile(, template)] or a URL
+            templates = book_data.get("url_templates", [])
+            for daf, record in enumerate(lessons, start=book_data.get("first_daf", 2)):
+                url = record if isinstance(record, str) else templates[record[3] if len(record) > 3 else 0].format(*record)
+                yield seder, book, f"{book} {daf}", url
+
+
+def check_catalog(lessons, workers, timeout, retries, backoff, progress=True):
+    """Checks every (seder, book, lesson, url) concurrently and returns (records, pool)."""
+    pool = ConnectionPool(timeout)
+    records = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(check_url, pool, url, retries, backoff): (seder, book, lesson, url)
+            for seder, book, lesson, url in lessons
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            seder, book, lesson, url = futures[future]
+            records.append({"seder": seder, "book": book, "lesson": lesson, "url": url, **future.result()})
+            if progress and done % 100 == 0:
+                print(f"  ... {done}/{len(futures)} checked")
+
+    # Keep the report in catalog order rather than completion order
+    order = {(seder, book, lesson): i for i, (seder, book, lesson, _) in enumerate(lessons)}
+    records.sort(key=lambda r: order[(r["seder"], r["book"], r["lesson"])])
+    return records, pool
+
+
+def write_reports(records, seconds, output_dir):
+    """Writes link_report.json and flagged_lessons.json and returns the failing records."""
+    failed = [r for r in records if not r["ok"]]
+    flagged = {}
+    for record in failed:
+        book_flags = flagged.setdefault(record["seder"], {}).setdefault(record["book"], {})
+        book_flags[record["lesson"]] = {k: record[k] for k in ("url", "status", "error", "attempts")}
+
+    os.makedirs(output_dir, exist_ok=True)
+    report = {
+        "checked": len(records),
+        "ok": len(records) - len(failed),
+        "failed": len(failed),
+        "seconds": round(seconds, 1),
+        "results": records,
+    }
+    with open(os.path.join(output_dir, "link_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(output_dir, "flagged_lessons.json"), "w", encoding="utf-8") as f:
+        json.dump(flagged, f, indent=2, ensure_ascii=False)
+    return failed
+
+
+def refresh_structure(structure, records):
+    """Returns a copy of the catalog with the URLs of the moved lessons replaced, and how many were."""
+    refreshed = copy.deepcopy(structure)
+    moved = [r for r in records if r.get("moved_to")]
+    for record in moved:
+        book_data = refreshed[record["seder"]]["books"][record["book"]]
+        lessons = book_data["lessons"]
+        if isinstance(lessons, dict):
+            lessons[record["lesson"]] = record["moved_to"]
+        else: # Compact records: a plain URL takes the place of the moved one
+            daf = int(record["lesson"].rsplit(" ", 1)[1])
+            lessons[daf - book_data.get("first_daf", 2)] = record["moved_to"]
+    return refreshed, len(moved)
+
+
+# --- Self-test against a local stub server ---
+def run_self_test(options):
+    """Checks a synthetic catalog served by a local http.server and verifies the results."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    hits = {}
+    client_ports = set()
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # keep-alive, so connection reuse can be verified
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, status, headers=None, body=b""):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def handle_request(self):
+            with lock:
+                hits[self.path] = hits.get(self.path, 0) + 1
+                count = hits[self.path]
+                client_ports.add(self.client_address[1])
+            if self.path == "/ok.mp4":
+                self.reply(200)
+            elif self.path == "/redirect.mp4":
+                self.reply(302, {"Location": "/ok.mp4"})
+            elif self.path == "/moved.mp4":
+                self.reply(301, {"Location": "/redirect.mp4"})
+            elif self.path == "/nohead.mp4":
+                if self.command == "HEAD":
+                    self.reply(405)
+                else:
+                    self.reply(206, {"Content-Range": "bytes 0-0/1000"}, b"x")
+            elif self.path == "/flaky.mp4":
+                self.reply(503 if count == 1 else 200)
+            elif self.path == "/loop.mp4":
+                self.reply(302, {"Location": "/loop.mp4"})
+            else:
+                self.reply(404)
+
+        do_HEAD = handle_request
+        do_GET = handle_request
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    expected = {"ok.mp4": True, "redirect.mp4": True, "moved.mp4": True, "nohead.mp4": True, "flaky.mp4": True,
+                "gone.mp4": False, "loop.mp4": False}
+    lessons = [("Stub", "Stub", name, f"{base}/{name}") for name in expected]
+    lessons += [("Stub", "Bulk", f"Bulk {i}", f"{base}/ok.mp4") for i in range(200)]
+
+    start = time.perf_counter()
+    records, pool = check_catalog(lessons, options.workers, options.timeout, retries=2, backoff=0.05,
+                                  progress=False)
+    seconds = time.perf_counter() - start
+    server.shutdown()
+
+    results = {r["lesson"]: r for r in records}
+    failures = [name for name, ok in expected.items() if results[name]["ok"] != ok]
+    failures += [f"Bulk {i}" for i in range(200) if not results[f"Bulk {i}"]["ok"]]
+    if results["flaky.mp4"]["attempts"] != 2:
+        failures.append("flaky.mp4 (expected one retry)")
+    # Only the permanent hop of moved.mp4 (301 then 302) goes into the refreshed catalog
+    structure = {"Stub": {"books": {"Stub": {"lessons": {name: f"{base}/{name}" for name in expected}}}}}
+    refreshed, moved = refresh_structure(structure, records)
+    refreshed_lessons = refreshed["Stub"]["books"]["Stub"]["lessons"]
+    if moved != 1 or refreshed_lessons["moved.mp4"] != f"{base}/redirect.mp4":
+        failures.append(f"refreshed catalog ({moved} moved, moved.mp4 -> {refreshed_lessons['moved.mp4']})")
+    if structure["Stub"]["books"]["Stub"]["lessons"]["moved.mp4"] != f"{base}/moved.mp4":
+        failures.append("refresh_structure() changed the checked catalog")
+    if len(client_ports) > options.workers:
+        failures.append(f"connection reuse ({len(client_ports)} connections for {options.workers} workers)")
+
+    print(f"Checked {len(records)} stub URLs in {seconds:.2f}s over {len(client_ports)} connections.")
+    if failures:
+        print(f"❌ Self-test failed: {', '.join(failures)}")
+        return 1
+    print("✅ Self-test passed.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the health of every lesson URL in the catalog.")
+    parser.add_argument("--structure", default=DEFAULT_STRUCTURE,
+                        help=f"catalog to check (default: {DEFAULT_STRUCTURE})")
+    parser.add_argument("--output-dir", default="link_check", help="where the reports are written")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent requests")
+    parser.add_argument("--timeout", type=float, default=15, help="per-request timeout in seconds")
+    parser.add_argument("--retries", type=int, default=2, help="retries for transient failures")
+    parser.add_argument("--backoff", type=float, default=0.5, help="base delay between retries in seconds")
+    parser.add_argument("--book", help="only check this masejta (e.g. 'Baba Kama')")
+    parser.add_argument("--limit", type=int, help="only check the first N lessons")
+    parser.add_argument("--self-test", action="store_true", help="run against a local stub HTTP server")
+    options = parser.parse_args()
+
+    if options.self_test:
+        return run_self_test(options)
+
+    try:
+        with open(options.structure, encoding="utf-8") as f:
+            structure = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read catalog '{options.structure}': {e}")
+        return 1
+
+    lessons = list(iter_lessons(structure, options.book))[:options.limit]
+    if not lessons:
+        print("⚠️ No lessons to check.")
+        return 1
+    print(f"Checking {len(lessons)} lesson URLs with {options.workers} workers...")
+
+    start = time.perf_counter()
+    records, pool = check_catalog(lessons, options.workers, options.timeout, options.retries, options.backoff)
+    seconds = time.perf_counter() - start
+    failed = write_reports(records, seconds, options.output_dir)
+    refreshed, moved = refresh_structure(structure, records)
+    if moved:
+        refreshed_path = os.path.join(options.output_dir, "refreshed_structure.json")
+        with open(refreshed_path, "w", encoding="utf-8") as f:
+            json.dump(refreshed, f, separators=(",", ":"), ensure_ascii=False)
+        print(f"ℹ️ {moved} lessons moved permanently, '{refreshed_path}' has their new URLs.")
+
+    print(f"Checked {len(records)} URLs in {seconds:.1f}s ({pool.opened} connections opened).")
+    if failed:
+        print(f"⚠️ {len(failed)} lessons failed, see '{os.path.join(options.output_dir, 'flagged_lessons.json')}':")
+        for record in failed[:20]:
+            print(f"  ❌ {record['book']} / {record['lesson']}: {record['error']}")
+        if len(failed) > 20:
+            print(f"  ... and {len(failed) - 20} more")
+        return 2
+    print("✅ All lesson URLs are reachable.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
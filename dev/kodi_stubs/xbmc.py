@@ -0,0 +1,125 @@
+"""Stand-in for Kodi's xbmc module, to run addon.py outside Kodi (see dev/bench_*.py).
+
+Only what the addon uses is implemented. Log lines are kept in LOG_RECORDS and printed
+when VERBOSE is set.
+"""
+import time
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+LOGFATAL = 4
+
+PLAYLIST_VIDEO = 1
+
+VERBOSE = False
+LOG_RECORDS = []
+BUILTINS = []
+INFO_LABELS = {}
+
+
+def log(msg, level=LOGDEBUG):
+    LOG_RECORDS.append((level, msg))
+    if VERBOSE:
+        print(f"[xbmc.log {level}] {msg}")
+
+
+def executebuiltin(function, wait=False):
+    BUILTINS.append(function)
+
+
+def getInfoLabel(label):
+    return INFO_LABELS.get(label, "")
+
+
+def getCondVisibility(condition):
+    return False
+
+
+def sleep(milliseconds):
+    time.sleep(milliseconds / 1000.0)
+
+
+class InfoTagVideo:
+    def __init__(self):
+        self.values = {}
+
+    def setTitle(self, title):
+        self.values['title'] = title
+
+    def setPlot(self, plot):
+        self.values['plot'] = plot
+
+    def setMediaType(self, media_type):
+        self.values['mediatype'] = media_type
+
+    def setTvShowTitle(self, title):
+        self.values['tvshowtitle'] = title
+
+    def setSeason(self, season):
+        self.values['season'] = season
+
+    def setEpisode(self, episode):
+        self.values['episode'] = episode
+
+    def setPlaycount(self, playcount):
+        self.values['playcount'] = playcount
+
+    def setResumePoint(self, time, totaltime=0.0):
+        self.values['resume'] = (time, totaltime)
+
+
+class Monitor:
+    def abortRequested(self):
+        return True
+
+    def waitForAbort(self, timeout=0):
+        return True
+
+
+class Player:
+    def isPlaying(self):
+        return False
+
+    def isPlayingVideo(self):
+        return False
+
+    def getPlayingFile(self):
+        return ''
+
+    def getTime(self):
+        return 0.0
+
+    def getTotalTime(self):
+        return 0.0
+
+    def play(self, item=None, listitem=None, windowed=False, startpos=-1):
+        BUILTINS.append(f"Player.play({item})")
+
+
+# Playing position per playlist, set by the caller to simulate playback
+PLAYLIST_POSITIONS = {}
+
+
+class PlayList:
+    _items = {}
+
+    def __init__(self, playlist):
+        self.playlist = playlist
+        self._items.setdefault(playlist, [])
+
+    def add(self, url, listitem=None, index=-1):
+        self._items[self.playlist].append((url, listitem))
+
+    def clear(self):
+        self._items[self.playlist] = []
+
+    def size(self):
+        return len(self._items[self.playlist])
+
+    def getposition(self):
+        return PLAYLIST_POSITIONS.get(self.playlist, 0)
+
+    def __len__(self):
+        return self.size()
@@ -0,0 +1,37 @@
+"""Stand-in for Kodi's xbmcaddon module, to run addon.py outside Kodi (see dev/bench_*.py).
+
+Settings come from SETTINGS (string values, as Kodi stores them).
+"""
+SETTINGS = {}
+
+ADDON_INFO = {
+    'id': 'plugin.video.guemara',
+    'name': 'Guemará en Español',
+    'version': '1.0.0',
+}
+
+
+class Addon:
+    def __init__(self, id=None):
+        self.addon_id = id or ADDON_INFO['id']
+
+    def getAddonInfo(self, key):
+        return ADDON_INFO.get(key, '')
+
+    def getSetting(self, id):
+        return SETTINGS.get(id, '')
+
+    def getSettingBool(self, id):
+        return SETTINGS.get(id) == 'true'
+
+    def getSettingInt(self, id):
+        return int(SETTINGS.get(id) or 0)
+
+    def getSettingString(self, id):
+        return SETTINGS.get(id, '')
+
+    def setSetting(self, id, value):
+        SETTINGS[id] = value
+
+    def getLocalizedString(self, id):
+        return ''
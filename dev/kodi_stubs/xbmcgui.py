@@ -0,0 +1,111 @@
+"""Stand-in for Kodi's xbmcgui module, to run addon.py outside Kodi (see dev/bench_*.py)."""
+import xbmc
+
+NOTIFICATION_INFO = 'info'
+NOTIFICATION_WARNING = 'warning'
+NOTIFICATION_ERROR = 'error'
+INPUT_ALPHANUM = 0
+
+# Answers returned by Dialog().input() / Dialog().select(), consumed in order
+DIALOG_INPUTS = []
+DIALOG_SELECTS = []
+NOTIFICATIONS = []
+
+LISTITEM_COUNT = 0
+
+
+class ListItem:
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        global LISTITEM_COUNT
+        LISTITEM_COUNT += 1
+        self.label = label
+        self.path = path
+        self.offscreen = offscreen
+        self.art = {}
+        self.info = {}
+        self.properties = {}
+        self.context_menu = []
+        self.mime_type = None
+        self._info_tag = None
+
+    def getLabel(self):
+        return self.label
+
+    def getPath(self):
+        return self.path
+
+    def setPath(self, path):
+        self.path = path
+
+    def setArt(self, art):
+        self.art.update(art)
+
+    def setInfo(self, type, infoLabels):
+        self.info.update(infoLabels)
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def getProperty(self, key):
+        return self.properties.get(key, '')
+
+    def setMimeType(self, mime_type):
+        self.mime_type = mime_type
+
+    def setContentLookup(self, enable):
+        pass
+
+    def addContextMenuItems(self, items, replaceItems=False):
+        self.context_menu.extend(items)
+
+    def getVideoInfoTag(self):
+        if self._info_tag is None:
+            self._info_tag = xbmc.InfoTagVideo()
+        return self._info_tag
+
+
+class Dialog:
+    def notification(self, heading, message, icon=NOTIFICATION_INFO, time=5000, sound=True):
+        NOTIFICATIONS.append((heading, message))
+
+    def input(self, heading, defaultt='', type=INPUT_ALPHANUM, option=0, autoclose=0):
+        return DIALOG_INPUTS.pop(0) if DIALOG_INPUTS else ''
+
+    def select(self, heading, list, autoclose=0, preselect=-1, useDetails=False):
+        return DIALOG_SELECTS.pop(0) if DIALOG_SELECTS else -1
+
+    def ok(self, heading, message):
+        return True
+
+    def yesno(self, heading, message, nolabel='', yeslabel='', autoclose=0):
+        return True
+
+
+class DialogProgress:
+    def create(self, heading, message=''):
+        pass
+
+    def update(self, percent, message=''):
+        pass
+
+    def iscanceled(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class Window:
+    _properties = {}
+
+    def __init__(self, existingWindowId=-1):
+        self.window_id = existingWindowId
+
+    def getProperty(self, key):
+        return self._properties.get((self.window_id, key), '')
+
+    def setProperty(self, key, value):
+        self._properties[(self.window_id, key)] = value
+
+    def clearProperty(self, key):
+        self._properties.pop((self.window_id, key), None)
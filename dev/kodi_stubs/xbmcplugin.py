@@ -0,0 +1,43 @@
+"""Stand-in for Kodi's xbmcplugin module, to run addon.py outside Kodi (see dev/bench_*.py).
+
+Every directory call is recorded in CALLS so a harness can inspect what a route produced.
+"""
+SORT_METHOD_NONE = 0
+SORT_METHOD_LABEL = 1
+SORT_METHOD_DATE = 3
+SORT_METHOD_TITLE = 9
+SORT_METHOD_EPISODE = 24
+SORT_METHOD_UNSORTED = 40
+SORT_METHOD_LABEL_IGNORE_THE = 2
+
+CALLS = []
+
+
+def addDirectoryItems(handle, items, totalItems=0):
+    CALLS.append(('addDirectoryItems', len(items)))
+    return True
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    CALLS.append(('addDirectoryItems', 1))
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    CALLS.append(('endOfDirectory', succeeded, cacheToDisc))
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    CALLS.append(('setResolvedUrl', succeeded, listitem.getPath()))
+
+
+def setContent(handle, content):
+    CALLS.append(('setContent', content))
+
+
+def addSortMethod(handle, sortMethod, labelMask='', label2Mask=''):
+    CALLS.append(('addSortMethod', sortMethod))
+
+
+def setPluginCategory(handle, category):
+    CALLS.append(('setPluginCategory', category))
@@ -0,0 +1,122 @@
+"""Stand-in for Kodi's xbmcvfs module, to run addon.py outside Kodi (see dev/bench_*.py).
+
+special:// paths are mapped with SPECIAL_PATHS, which a harness points at the repository
+(special://home/addons/<addon id>/) and at a scratch profile directory.
+"""
+import os
+import shutil
+import tempfile
+
+SPECIAL_PATHS = {
+    'special://home/addons/plugin.video.guemara': os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'special://profile': os.path.join(tempfile.gettempdir(), 'guemara-kodi-profile'),
+}
+
+
+def translatePath(path):
+    for prefix, real_path in SPECIAL_PATHS.items():
+        if path.startswith(prefix):
+            rest = path[len(prefix):].lstrip('/')
+            translated = os.path.join(real_path, *rest.split('/')) if rest else real_path
+            return translated + os.sep if path.endswith('/') and rest else translated
+    return path
+
+
+class File:
+    def __init__(self, path, mode='r'):
+        self._path = path
+        self._mode = mode
+        try:
+            self._f = open(path, 'wb' if 'w' in mode else 'rb')
+        except OSError:
+            self._f = None
+
+    def read(self, numBytes=-1):
+        return self.readBytes(numBytes).decode('utf-8') if self._f else ''
+
+    def readBytes(self, numBytes=-1):
+        return bytearray(self._f.read(numBytes)) if self._f else bytearray()
+
+    def write(self, buffer):
+        if not self._f:
+            return False
+        self._f.write(buffer.encode('utf-8') if isinstance(buffer, str) else buffer)
+        return True
+
+    def size(self):
+        return os.path.getsize(self._path) if self._f else 0
+
+    def close(self):
+        if self._f:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Stat:
+    def __init__(self, path):
+        self._stat = os.stat(path)
+
+    def st_size(self):
+        return self._stat.st_size
+
+    def st_mtime(self):
+        return int(self._stat.st_mtime)
+
+
+def exists(path):
+    return os.path.exists(path)
+
+
+def mkdir(path):
+    return mkdirs(path)
+
+
+def mkdirs(path):
+    os.makedirs(path, exist_ok=True)
+    return True
+
+
+def delete(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+def rmdir(path, force=False):
+    try:
+        if force:
+            shutil.rmtree(path)
+        else:
+            os.rmdir(path)
+        return True
+    except OSError:
+        return False
+
+
+def rename(file, newFile):
+    try:
+        os.replace(file, newFile)
+        return True
+    except OSError:
+        return False
+
+
+def copy(file, newFile):
+    try:
+        shutil.copyfile(file, newFile)
+        return True
+    except OSError:
+        return False
+
+
+def listdir(path):
+    entries = os.listdir(path)
+    dirs = [e for e in entries if os.path.isdir(os.path.join(path, e))]
+    return dirs, [e for e in entries if e not in dirs]
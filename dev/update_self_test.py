@@ -0,0 +1,137 @@
+"""Self-test of the remote catalog updates (resources/lib/catalog_updates.py) against a local HTTP server.
+
+The bundled catalog in resources/catalog/ is copied to a temporary folder, served with
+http.server (which answers If-Modified-Since with 304) and changed the way a new catalog
+release would be. The addon runs with the stand-ins in kodi_stubs/ and a scratch profile, and
+the test verifies that:
+
+  - a new version downloads only the shard that changed, and its lessons are then served
+  - the next check is answered with a 304 and changes nothing
+  - a shard that does not match its manifest hash is rejected, keeping the active catalog
+  - a manifest with a shard path outside the catalog folder is rejected before downloading
+
+Usage (from the dev folder): python update_self_test.py
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+DEV_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(DEV_DIR)
+CHANGED_BOOK = ("Moed", "Yoma")
+
+
+def release(remote_dir, serial, shard_content, shard_hash=None):
+    """Publishes catalog version 'selftest<serial>' in remote_dir, replacing the shard of CHANGED_BOOK."""
+    manifest_path = os.path.join(remote_dir, "manifest.json")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    book = manifest[CHANGED_BOOK[0]]["books"][CHANGED_BOOK[1]]
+    with open(os.path.join(remote_dir, *book["shard"].split("/")), "wb") as f:
+        f.write(shard_content)
+    book["hash"] = shard_hash or hashlib.sha1(shard_content).hexdigest()[:12]
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"), ensure_ascii=False)
+    version_path = os.path.join(remote_dir, "version")
+    with open(version_path, "w", encoding="utf-8") as f:
+        f.write(f"selftest{serial:04d}")
+    # Last-Modified has a one second resolution: make sure each release is newer than the last
+    modified = os.path.getmtime(version_path) + 10 * serial
+    os.utime(version_path, (modified, modified))
+
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix="guemara-update-")
+    remote_dir = os.path.join(work_dir, "remote")
+    shutil.copytree(os.path.join(ADDON_DIR, "resources", "catalog"), remote_dir,
+                    ignore=shutil.ignore_patterns("guemara.db"))
+
+    requests = []
+
+    class CatalogHandler(SimpleHTTPRequestHandler):
+        def log_request(self, code="-", size="-"):
+            requests.append((self.path, int(code)))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CatalogHandler, directory=remote_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    # addon.py as Kodi would run it, with a scratch profile
+    sys.path[:0] = [os.path.join(DEV_DIR, "kodi_stubs"), ADDON_DIR]
+    import xbmcvfs
+    xbmcvfs.SPECIAL_PATHS["special://profile"] = os.path.join(work_dir, "profile")
+    sys.argv = sys.argv[:1]
+    import addon
+    from resources.lib.catalog_updates import update_catalog
+
+    failures = []
+    shard_name = f"shards/{CHANGED_BOOK[1]}.json"
+    with open(os.path.join(remote_dir, *shard_name.split("/")), encoding="utf-8") as f:
+        shard = json.load(f)
+    lesson_id = addon.make_lesson_id(CHANGED_BOOK[1], f"{CHANGED_BOOK[1]} {shard.get('first_daf', 2)}")
+
+    # 1. A release that changes one shard
+    shard["lessons"][0] = "https://example.com/changed.mp4"
+    release(remote_dir, 1, json.dumps(shard, separators=(",", ":")).encode("utf-8"))
+    if not update_catalog(base_url):
+        failures.append("new version not activated")
+    shard_gets = [path for path, _ in requests if path.startswith("/shards/")]
+    if shard_gets != [f"/{shard_name}"]:
+        failures.append(f"expected one shard download, got {shard_gets}")
+    if addon.catalog_version() != "selftest0001" or addon.catalog_resolve(lesson_id)[1] != shard["lessons"][0]:
+        failures.append("changed lesson not served from the new catalog")
+
+    # 2. Nothing new: the version check is a 304
+    del requests[:]
+    if update_catalog(base_url):
+        failures.append("unchanged catalog activated again")
+    if requests != [("/version", 304)]:
+        failures.append(f"expected a single 304 for the version, got {requests}")
+
+    # 3. A shard that does not match its hash
+    shard["lessons"][0] = "https://example.com/tampered.mp4"
+    release(remote_dir, 2, json.dumps(shard, separators=(",", ":")).encode("utf-8"), shard_hash="0" * 12)
+    try:
+        update_catalog(base_url)
+        failures.append("shard with a wrong hash accepted")
+    except ValueError:
+        pass
+    addon.select_catalog_dir()
+    if addon.catalog_version() != "selftest0001":
+        failures.append("active catalog changed after a rejected update")
+
+    # 4. A manifest pointing a shard outside the catalog folder
+    shard["lessons"][0] = "https://example.com/escaped.mp4"
+    release(remote_dir, 3, json.dumps(shard, separators=(",", ":")).encode("utf-8"))
+    manifest_path = os.path.join(remote_dir, "manifest.json")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest[CHANGED_BOOK[0]]["books"][CHANGED_BOOK[1]]["shard"] = "../../escaped.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"), ensure_ascii=False)
+    del requests[:]
+    try:
+        update_catalog(base_url)
+        failures.append("shard path outside the catalog folder accepted")
+    except ValueError:
+        pass
+    if any("escaped" in path for path, _ in requests):
+        failures.append("shard outside the catalog folder downloaded")
+
+    server.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    if failures:
+        print(f"❌ Self-test failed: {', '.join(failures)}")
+        return 1
+    print("✅ Self-test passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Remote catalog updates of plugin.video.guemara, imported by service.py and the settings button.
+
+Kept out of addon.py so that the listings, compiled from source on every click, do not carry it.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import urllib.parse
+
+import xbmc
+import xbmcgui
+
+import addon
+
+# The catalog can be updated without an addon release: update_catalog() checks the
+# 'catalog_url' folder (laid out like resources/catalog/) with a conditional request for its
+# version file, and on a new version downloads the manifest plus only the shards whose hash
+# differs from the active catalog's. The new catalog is assembled in a temporary folder of
+# the profile, and activated by atomically replacing the state file that points to it.
+# It runs from service.py (or the "update now" settings button), never from a listing.
+UPDATE_TIMEOUT = 20 # Seconds per request
+
+def _fetch(url, validators=None):
+    """GETs a URL. Returns (body, validators), or (None, validators) when the server answers 304."""
+    import urllib.request # Slow to import, only needed here
+    import urllib.error
+    headers = {'User-Agent': f'{addon.ADDON_ID} (Kodi)'}
+    if validators and validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators and validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=UPDATE_TIMEOUT) as response:
+            body, response_headers = response.read(), response.headers
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+        return None, validators
+    return body, {'etag': response_headers.get('ETag'), 'last_modified': response_headers.get('Last-Modified')}
+
+def _write_bytes(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def update_catalog(base_url):
+    """Downloads a new catalog version from base_url if there is one. Returns True when one was activated."""
+    base_url = base_url.rstrip('/') + '/'
+    state = addon.read_update_state()
+    addon.select_catalog_dir()
+    # The validators describe the files of the downloaded catalog: they only hold while it is
+    # the active one (an addon upgrade goes back to the bundled catalog) and for the same URL
+    active = state.get('current') and addon.CATALOG_DIR == os.path.join(addon.UPDATES_DIR, state['current'])
+    validators = state.get('validators', {}) if active and state.get('url') == base_url else {}
+    state.update({'checked': time.time(), 'url': base_url, 'validators': validators, 'error': None})
+    os.makedirs(addon.UPDATES_DIR, exist_ok=True)
+    try:
+        return _download_catalog(base_url, state, dict(validators))
+    except Exception as e:
+        # A failed attempt also waits for the next interval (see catalog_update_due()) instead
+        # of being retried on every service pass
+        _write_update_state({**state, 'error': str(e)})
+        raise
+
+def _download_catalog(base_url, state, validators):
+    """update_catalog() itself: checks the version, then assembles and activates the new catalog."""
+    import shutil
+    version_raw, validators['version'] = _fetch(base_url + 'version', validators.get('version'))
+    remote_version = version_raw.decode('utf-8').strip() if version_raw is not None else None
+    if remote_version is None or remote_version == addon.catalog_version(refresh=True):
+        xbmc.log("[Guemara] Catalog is up to date", xbmc.LOGINFO)
+        _write_update_state({**state, 'validators': validators})
+        return False
+
+    manifest_raw, _ = _fetch(base_url + 'manifest.json')
+    remote_manifest = json.loads(manifest_raw)
+    # Shard paths are joined onto catalog folders: only plain 'shards/<name>.json' are accepted
+    for seder_data in remote_manifest.values():
+        for book, data in seder_data.get('books', {}).items():
+            if not re.fullmatch(r'shards/[\w .-]+\.json', data.get('shard', '')) or '..' in data['shard']:
+                raise ValueError(f"Invalid shard path '{data.get('shard')}' for '{book}' in the downloaded manifest")
+    try:
+        local_books = {book: data for seder_data in addon.read_catalog_file(addon.MANIFEST_FILE).values()
+                       for book, data in seder_data.get('books', {}).items()}
+    except Exception:
+        local_books = {}
+
+    update_name = f"v{remote_version}"
+    update_dir = os.path.join(addon.UPDATES_DIR, update_name)
+    tmp_dir = f"{update_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, 'shards'))
+
+    downloaded = 0
+    for seder_data in remote_manifest.values():
+        for book, data in seder_data.get('books', {}).items():
+            shard = data['shard']
+            target = os.path.join(tmp_dir, *shard.split('/'))
+            local = local_books.get(book, {})
+            local_path = os.path.join(addon.CATALOG_DIR, *local['shard'].split('/')) if local.get('shard') else ''
+            if data.get('hash') and local.get('hash') == data['hash'] and os.path.isfile(local_path):
+                shutil.copyfile(local_path, target)
+                continue
+            content, _ = _fetch(base_url + urllib.parse.quote(shard))
+            if data.get('hash') and hashlib.sha1(content).hexdigest()[:12] != data['hash']:
+                raise ValueError(f"Downloaded shard '{shard}' does not match its hash")
+            _write_bytes(target, content)
+            downloaded += 1
+
+    # The search index and Daf Yomi table change with the books, not the lessons: usually a 304
+    for name, required in (('search_index.json', True), ('daf_yomi.json', False)):
+        key = name.rsplit('.', 1)[0]
+        local_path = os.path.join(addon.CATALOG_DIR, name)
+        try:
+            content, validators[key] = _fetch(base_url + name, validators.get(key) if os.path.isfile(local_path) else None)
+        except OSError:
+            if required:
+                raise
+            continue # Optional, see dev/build_structure.py
+        if content is None:
+            shutil.copyfile(local_path, os.path.join(tmp_dir, name))
+        else:
+            _write_bytes(os.path.join(tmp_dir, name), content)
+    _write_bytes(os.path.join(tmp_dir, 'manifest.json'), manifest_raw)
+    _write_bytes(os.path.join(tmp_dir, 'version'), version_raw)
+
+    shutil.rmtree(update_dir, ignore_errors=True)
+    os.replace(tmp_dir, update_dir)
+    previous = state.get('current')
+    _write_update_state({**state, 'current': update_name, 'based_on': addon.read_version_file(addon.BUNDLED_CATALOG_DIR),
+                         'validators': validators, 'updated': time.time()})
+
+    # Keep the previous catalog for invocations still reading it, remove older ones
+    for name in os.listdir(addon.UPDATES_DIR):
+        if name not in (update_name, previous, os.path.basename(addon.UPDATES_STATE_FILE)):
+            shutil.rmtree(os.path.join(addon.UPDATES_DIR, name), ignore_errors=True)
+
+    xbmc.log(f"[Guemara] Catalog updated to {remote_version} ({downloaded} shards downloaded)", xbmc.LOGINFO)
+    addon.select_catalog_dir()
+    return True
+
+def _write_update_state(state):
+    """Writes the update state atomically: replacing it is what switches to a new catalog."""
+    tmp_path = f"{addon.UPDATES_STATE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, addon.UPDATES_STATE_FILE)
+
+def catalog_update_due():
+    """Returns True when remote updates are enabled and the last check is older than the configured interval."""
+    if not addon.get_setting_bool('catalog_updates') or not addon.get_setting('catalog_url'):
+        return False
+    interval = max(addon.get_setting_int('catalog_update_hours', 24), 1) * 3600
+    return time.time() - addon.read_update_state().get('checked', 0) >= interval
+
+def update_catalog_now():
+    """Settings button: checks for a catalog update right away and reports the result."""
+    catalog_url = addon.get_setting('catalog_url')
+    if not catalog_url:
+        xbmcgui.Dialog().notification("Guemara", "No hay dirección de catálogo configurada", xbmcgui.NOTIFICATION_WARNING, 3000)
+        return
+    try:
+        updated = update_catalog(catalog_url)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Catalog update from '{catalog_url}' failed: {e}", xbmc.LOGWARNING)
+        xbmcgui.Dialog().notification("Guemara", "No se pudo actualizar el catálogo", xbmcgui.NOTIFICATION_ERROR, 3000)
+        return
+    message = "Catálogo actualizado" if updated else "El catálogo ya está al día"
+    xbmcgui.Dialog().notification("Guemara", message, xbmcgui.NOTIFICATION_INFO, 3000)
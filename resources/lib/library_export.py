@@ -0,0 +1,143 @@
+"""Library export of plugin.video.guemara, imported only by its settings button.
+
+Kept out of addon.py so that the listings, compiled from source on every click, do not carry it.
+"""
+import os
+import json
+import hashlib
+
+import xbmc
+import xbmcgui
+import xbmcvfs
+
+import addon
+
+# Writes the catalog as a TV-show library that Kodi scans with its "Local information only"
+# scraper: one show per masejta (its Seder as genre) and one episode per daf, an .strm with
+# the short play URL plus an .nfo. Browsing and searching it is then answered from Kodi's
+# video database, without a plugin invocation per click. Re-running it only rewrites the
+# masechtot whose files would differ from the last export.
+LIBRARY_FORMAT = 2 # Bump when the layout of the exported files changes, to rewrite all of them
+LIBRARY_STATE_FILE = os.path.join(addon.ADDON_PROFILE, 'library_export.json') # What export_library() last wrote
+
+def _xml_text(text):
+    from xml.sax.saxutils import escape # Only needed here
+    return escape(str(text))
+
+def library_book_files(seder, book, description, titles):
+    """Returns {filename: content} of the library files of one masejta (its poster is copied separately)."""
+    show_nfo = ["<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>", "<tvshow>",
+                f"    <title>{_xml_text(book)}</title>",
+                f"    <plot>{_xml_text(description)}</plot>",
+                f"    <genre>Seder {_xml_text(seder)}</genre>",
+                "    <studio>Guemara</studio>",
+                "</tvshow>"]
+    files = {'tvshow.nfo': '\n'.join(show_nfo) + '\n'}
+
+    plot = f"Tratado de {book}, Seder {seder}"
+    for title in titles:
+        daf = int(title.rsplit(' ', 1)[-1])
+        name = f"{book} S01E{daf:03d}" # The daf is the episode number
+        files[f"{name}.strm"] = addon.build_url({'action': 'play', 'id': addon.make_lesson_id(book, title)}) + '\n'
+        files[f"{name}.nfo"] = (
+            "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>\n<episodedetails>\n"
+            f"    <title>{_xml_text(title)}</title>\n    <showtitle>{_xml_text(book)}</showtitle>\n"
+            f"    <season>1</season>\n    <episode>{daf}</episode>\n    <plot>{_xml_text(plot)}</plot>\n"
+            "</episodedetails>\n")
+    return files
+
+def _library_join(root, *parts):
+    """Joins a library folder (local or a Kodi network path such as smb://) with names under it."""
+    sep = '\\' if '\\' in root and '://' not in root else '/'
+    return root.rstrip('/\\') + sep + sep.join(parts)
+
+def _write_library_file(path, content):
+    f = xbmcvfs.File(path, 'w')
+    try:
+        if not f.write(content.encode('utf-8')):
+            raise OSError(f"Could not write '{path}'")
+    finally:
+        f.close()
+
+def export_library(root, progress=None):
+    """Exports the catalog to the library folder `root`. Returns (masechtot written, masechtot removed).
+
+    `progress`, if given, is called as progress(percent, book) and returns False to stop early;
+    the masechtot exported so far are kept and the next run continues with the rest.
+    """
+    try:
+        state = addon.read_json_file(LIBRARY_STATE_FILE)
+    except ValueError:
+        state = {} # Never exported
+    if state.get('path') != root or state.get('format') != LIBRARY_FORMAT:
+        state = {'path': root, 'format': LIBRARY_FORMAT, 'books': {}} # Export everything again
+    exported = state['books']
+
+    books = [(seder, book, description, thumb)
+             for seder, _, _ in addon.catalog_sedarim() for book, description, _, thumb in addon.catalog_books(seder)]
+    written = 0
+    try:
+        for position, (seder, book, description, thumb) in enumerate(books):
+            if progress and progress(position * 100 // len(books), book) is False:
+                break
+            titles = [title for title, _ in addon.catalog_lessons(seder, book)]
+            files = library_book_files(seder, book, description, titles)
+            # The poster is a copy of the book artwork, so the folder also works from other devices
+            poster = [thumb, int(os.path.getmtime(thumb))] if thumb and os.path.isfile(thumb) else None
+            digest = hashlib.sha1(json.dumps([files, poster], sort_keys=True).encode('utf-8')).hexdigest()
+            previous = exported.get(book, {})
+            if previous.get('hash') == digest:
+                continue
+
+            book_dir = _library_join(root, book)
+            xbmcvfs.mkdirs(book_dir)
+            for name, content in files.items():
+                _write_library_file(_library_join(book_dir, name), content)
+            names = set(files)
+            if poster and xbmcvfs.copy(thumb, _library_join(book_dir, 'poster.jpg')):
+                names.add('poster.jpg')
+            for name in set(previous.get('files', [])) - names: # Dafim no longer in the catalog
+                xbmcvfs.delete(_library_join(book_dir, name))
+            exported[book] = {'hash': digest, 'files': sorted(names)}
+            written += 1
+
+        removed = [book for book in exported if book not in {book for _, book, _, _ in books}]
+        for book in removed:
+            book_dir = _library_join(root, book)
+            for name in exported.pop(book).get('files', []):
+                xbmcvfs.delete(_library_join(book_dir, name))
+            xbmcvfs.rmdir(book_dir) # Only goes away if nothing else was put in it
+    finally:
+        # Saved even when interrupted, so that what was written is not written again
+        xbmcvfs.mkdirs(addon.ADDON_PROFILE)
+        with open(LIBRARY_STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+    xbmc.log(f"[Guemara] Library export to '{root}': {written} masechtot written, {len(removed)} removed", xbmc.LOGINFO)
+    return written, len(removed)
+
+def export_library_now():
+    """Settings button: exports the catalog to the configured library folder with a progress dialog."""
+    root = addon.get_setting('library_path')
+    if not root:
+        xbmcgui.Dialog().notification("Guemara", "Elige primero la carpeta de la biblioteca", xbmcgui.NOTIFICATION_WARNING, 3000)
+        return
+    dialog = xbmcgui.DialogProgress()
+    dialog.create("Guemara", "Exportando a la biblioteca...")
+
+    def progress(percent, book):
+        dialog.update(percent, f"Exportando a la biblioteca...\n{book}")
+        return not dialog.iscanceled()
+
+    try:
+        written, removed = export_library(root, progress)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Library export to '{root}' failed: {e}", xbmc.LOGERROR)
+        xbmcgui.Dialog().notification("Guemara", "No se pudo exportar a la biblioteca", xbmcgui.NOTIFICATION_ERROR, 3000)
+        return
+    finally:
+        dialog.close()
+
+    if written or removed:
+        xbmc.executebuiltin(f"UpdateLibrary(video,{root})") # Scans it if the folder is already a source
+    xbmcgui.Dialog().notification("Guemara", f"Biblioteca: {written} masechtot actualizadas", xbmcgui.NOTIFICATION_INFO, 3000)
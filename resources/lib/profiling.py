@@ -0,0 +1,58 @@
+"""Profiling records and cProfile reports of plugin.video.guemara, imported only when profiling is enabled."""
+import os
+import json
+import datetime
+
+import xbmc
+import xbmcvfs
+
+import addon
+
+
+def write_profiling_record(action, raw_params, total):
+    """Appends this invocation's phase timings as a JSON line to a rotating log in the profile."""
+    import logging.handlers # Only imported when profiling is enabled
+
+    try:
+        xbmcvfs.mkdirs(addon.PROFILING_DIR)
+        logger = logging.getLogger('guemara.profiling')
+        logger.propagate = False
+        if not logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(addon.PROFILING_DIR, 'timings.jsonl'), maxBytes=256 * 1024, backupCount=3, encoding='utf-8')
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+        record = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'action': action or 'root',
+            'params': raw_params,
+            'total_ms': round(total * 1000, 2),
+            'phases_ms': {phase: round(seconds * 1000, 2) for phase, seconds in addon.PHASE_TIMINGS.items()},
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+        for handler in logger.handlers:
+            handler.close()
+    except Exception as e:
+        xbmc.log(f"[Guemara] Could not write profiling record: {e}", xbmc.LOGWARNING)
+
+def route_with_cprofile(action, params):
+    """Runs a route under cProfile and writes the stats and a text report to the profile."""
+    import cProfile # Only imported for the single profiled invocation
+    import pstats
+    import io
+
+    profiler = cProfile.Profile()
+    profiler.runcall(addon.route, action, params)
+    try:
+        xbmcvfs.mkdirs(addon.PROFILING_DIR)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        base_path = os.path.join(addon.PROFILING_DIR, f"cprofile-{action or 'root'}-{stamp}")
+        profiler.dump_stats(base_path + '.prof')
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(40)
+        with open(base_path + '.txt', 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        xbmc.log(f"[Guemara] cProfile report written to {base_path}.txt", xbmc.LOGINFO)
+    except Exception as e:
+        xbmc.log(f"[Guemara] Could not write cProfile report: {e}", xbmc.LOGWARNING)
@@ -0,0 +1,141 @@
+"""Background service of plugin.video.guemara: keeps the catalog warm between plugin invocations.
+
+Kodi starts a fresh interpreter for every plugin:// click. This service runs for the whole
+Kodi session and publishes the catalog files (manifest, shards, search index) as home
+window properties, which addon.py reads instead of the files (see read_service_part()).
+It republishes when a different catalog is installed or downloaded (it also runs the
+remote catalog updates, see resources/lib/catalog_updates.py) and clears everything when the
+'service_cache' setting is switched off or Kodi exits. It also saves the study progress
+of the lessons the plugin starts (see register_playback()).
+"""
+import os
+import time
+
+import xbmc
+import xbmcgui
+import xbmcvfs
+
+import addon
+from resources.lib import catalog_updates
+
+CHECK_INTERVAL = 60 # Seconds between checks for a new catalog or a settings change
+PROGRESS_INTERVAL = 5 # Seconds between samples of the playing position
+
+
+def catalog_parts():
+    """Yields (part, path) for every file in the catalog folder that addon.py reads."""
+    for dirpath, _, filenames in os.walk(addon.CATALOG_DIR):
+        for filename in sorted(filenames):
+            if filename.endswith('.json'):
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, addon.CATALOG_DIR).replace(os.sep, '/'), path
+
+
+def publish_catalog(window, version):
+    """Publishes every catalog file, then the version stamp that makes them visible to the plugin."""
+    window.clearProperty(addon.service_property('version'))
+    parts = []
+    for part, path in catalog_parts():
+        f = xbmcvfs.File(path)
+        content = f.read()
+        f.close()
+        if content:
+            window.setProperty(addon.service_property(part), content)
+            parts.append(part)
+    window.setProperty(addon.service_property('version'), version)
+    xbmc.log(f"[Guemara] Service published catalog {version} ({len(parts)} files)", xbmc.LOGINFO)
+    return parts
+
+
+def clear_catalog(window, parts):
+    window.clearProperty(addon.service_property('version'))
+    for part in parts:
+        window.clearProperty(addon.service_property(part))
+
+
+class ProgressTracker(xbmc.Player):
+    """Saves the progress of the lessons the plugin registered while Kodi plays them."""
+
+    def __init__(self):
+        super().__init__()
+        self.lesson_id, self.position, self.total = None, 0.0, 0.0
+
+    def sample(self):
+        """Records the playing position, called every PROGRESS_INTERVAL seconds."""
+        if not self.lesson_id:
+            return
+        try:
+            if self.isPlayingVideo():
+                self.position, self.total = self.getTime(), self.getTotalTime()
+        except RuntimeError: # Playback ended between the checks
+            pass
+
+    def finish(self, ended=False):
+        """Saves the lesson that was playing, if it is one of ours."""
+        if self.lesson_id:
+            addon.save_progress(self.lesson_id, self.total if ended and self.total else self.position, self.total)
+        self.lesson_id, self.position, self.total = None, 0.0, 0.0
+
+    def onAVStarted(self):
+        self.finish() # The previous playlist item, if any
+        try:
+            self.lesson_id = addon.playing_lesson(self.getPlayingFile())
+        except RuntimeError:
+            return
+        if self.lesson_id:
+            self.sample()
+            addon.save_progress(self.lesson_id, self.position, self.total) # Now the last one played
+
+    def onPlayBackStopped(self):
+        self.finish()
+
+    def onPlayBackEnded(self):
+        self.finish(ended=True)
+
+
+def check_catalog(window, published):
+    """Runs a due catalog update, then publishes or clears the catalog. Returns the new (version, parts)."""
+    addon.reload_settings() # So that changed settings are seen
+    # Background catalog updates, so that no listing ever waits on the network
+    if catalog_updates.catalog_update_due():
+        try:
+            catalog_updates.update_catalog(addon.get_setting('catalog_url'))
+        except Exception as e:
+            xbmc.log(f"[Guemara] Catalog update failed: {e}", xbmc.LOGWARNING)
+    addon.select_catalog_dir() # Also picks up an update made from the settings
+
+    published_version, parts = published
+    enabled = addon.get_setting('service_cache') != 'false'
+    if enabled:
+        version = addon.catalog_version(refresh=True)
+        if version != published_version:
+            clear_catalog(window, parts)
+            return version, publish_catalog(window, version)
+    elif published_version:
+        clear_catalog(window, parts)
+        xbmc.log("[Guemara] Service cache disabled, catalog cleared", xbmc.LOGINFO)
+        return None, []
+    return published
+
+
+def run():
+    monitor = xbmc.Monitor()
+    window = xbmcgui.Window(addon.SERVICE_WINDOW_ID)
+    tracker = ProgressTracker()
+    published = (None, []) # Version and parts published
+    last_check = 0
+
+    while not monitor.abortRequested():
+        if time.time() - last_check >= CHECK_INTERVAL:
+            last_check = time.time()
+            published = check_catalog(window, published)
+        tracker.sample()
+        if monitor.waitForAbort(PROGRESS_INTERVAL):
+            break
+
+    tracker.finish()
+    clear_catalog(window, published[1])
+
+
+if __name__ == '__main__':
+    run()